@@ -17,6 +17,12 @@ class RequestArgs(BaseModel):
     username: str
     password: str
 
+class LookupArgs(BaseModel):
+    ids: list[str]
+
+# Largest number of ids a single lookup may resolve
+MAX_LOOKUP_IDS = 1000
+
 app = FastAPI(title="Authentication Adapter", description="Interacts with the authentication database.")
 
 @app.get("/user_name/{id}")
@@ -28,6 +34,18 @@ def get_user_name(id: str):
         else:
             return user.username
 
+@app.post("/users/lookup")
+def lookup_users(args: LookupArgs):
+    """
+    Resolve many user ids to usernames in one query, unknown ids are left out of the result
+    """
+    if len(args.ids) > MAX_LOOKUP_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_LOOKUP_IDS} ids can be looked up at once")
+
+    with Session(engine) as session:
+        rows = session.execute(select(User.id, User.username).filter(User.id.in_(set(args.ids)))).all()
+        return {row.id: row.username for row in rows}
+
 @app.get("/user_id/{username}")
 def get_user_id(username: str):
     with Session(engine) as session:
@@ -149,11 +149,14 @@ async def get_game_status(request: Request, game_id: int):
         )
 
 @app.get("/user_games/{user_id}")
-async def get_user_games(request: Request, user_id: str):
+async def get_user_games(request: Request, user_id: str, limit: int = 50, cursor: Optional[int] = None):
     verify_jwt_token(request)
     try:
         async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(f"{MEMORY_LOGIC_URL}/user_games/{user_id}")
+            params = {"limit": limit}
+            if cursor is not None:
+                params["cursor"] = cursor
+            response = await client.get(f"{MEMORY_LOGIC_URL}/user_games/{user_id}", params=params)
 
             if response.status_code != 200:
                 raise HTTPException(
@@ -1,12 +1,14 @@
-from fastapi import FastAPI
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Text, DateTime, func, ForeignKey
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, Text, DateTime, func, ForeignKey, Index, and_, column, distinct, select, update, values
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import sessionmaker, relationship, column_property
+from sqlalchemy.dialects.postgresql import UUID, insert
+from sqlalchemy.schema import CreateIndex
+import hashlib
 import os
 from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 import uuid
 
@@ -36,6 +38,18 @@ class Game(Base):
     # Relationship to cards with cascade delete
     cards = relationship("Card", back_populates="game", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Games of a user newest first, keyset pages of /users/{user_id}/games
+        Index("games_user_recent", "userId", "id"),
+    )
+
+# Image model, every distinct image is stored once and shared by all cards showing it
+class Image(Base):
+    __tablename__ = "images"
+
+    id = Column(String(64), primary_key=True)  # SHA-256 of the base64 data
+    data = Column(Text, nullable=False)
+
 # Card model
 class Card(Base):
     __tablename__ = "cards"
@@ -45,12 +59,25 @@ class Card(Base):
     gameId = Column(Integer, ForeignKey("games.id"), nullable=False)
     flipped = Column(Boolean, nullable=False)
     ownedBy = Column(Boolean, nullable=True)
-    image = Column(Text, nullable=False)
+    imageId = Column(String(64), ForeignKey("images.id"), nullable=False)
     kindId = Column(Integer, nullable=False)
+
+    # The base64 data of the image, resolved from the images table whenever cards are loaded
+    image = column_property(select(Image.data).where(Image.id == imageId).scalar_subquery())
     
     # Relationship to game
     game = relationship("Game", back_populates="cards")
 
+    __table_args__ = (
+        # Cards of a game in table order, read on every flip and game state
+        Index("cards_game_local", "gameId", "localId"),
+        # Cards of one kind still on the table, move_cards_to_player
+        Index("cards_game_kind_owner", "gameId", "kindId", "ownedBy"),
+    )
+
+# Largest page of games /users/{user_id}/games returns
+MAX_PAGE_SIZE = 100
+
 app = FastAPI(title="Memory Game Adapter API", version="1.0.0", description="API for managing memory games and cards")
 
 @app.on_event("startup")
@@ -58,6 +85,11 @@ async def startup_event():
     # Create tables on startup
     try:
         Base.metadata.create_all(bind=engine)
+        # create_all skips tables that already exist, their indexes are added here
+        with engine.begin() as connection:
+            for table in (Game.__table__, Card.__table__):
+                for index in table.indexes:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
         print("Database tables created successfully")
     except Exception as e:
         print(f"Error creating tables: {e}")
@@ -68,14 +100,38 @@ class GameCreate(BaseModel):
     winner: Optional[str] = None  # Can be "none", "draw", "player1", "player2", or None
     currentTurn: bool = True
 
+class ImageCreate(BaseModel):
+    image: str
+
 class CardCreate(BaseModel):
     localId: int
     gameId: int
     flipped: bool
     ownedBy: Optional[bool] = None  # None=table, False=player1, True=player2
-    image: str
+    image: Optional[str] = None  # base64 data, or the imageId of an image already stored
+    imageId: Optional[str] = None
     kindId: int
 
+class BulkCard(BaseModel):
+    localId: int
+    flipped: bool = False
+    ownedBy: Optional[bool] = None
+    image: Optional[str] = None  # base64 data, or the imageId of an image already stored
+    imageId: Optional[str] = None
+    imageIndex: Optional[int] = None  # position in the images of the request
+    kindId: int
+
+class BulkCardsCreate(BaseModel):
+    images: List[str] = []  # base64 data, sent once however many cards reference it
+    cards: List[BulkCard]
+
+class CardPosition(BaseModel):
+    id: int
+    localId: int
+
+class CardPositionsUpdate(BaseModel):
+    positions: List[CardPosition]
+
 class MoveCardsRequest(BaseModel):
     kindId: int
     player: bool
@@ -93,6 +149,7 @@ class CardUpdate(BaseModel):
     flipped: Optional[bool] = None
     ownedBy: Optional[bool] = None
     image: Optional[str] = None
+    imageId: Optional[str] = None
     kindId: Optional[int] = None
 
 
@@ -103,6 +160,19 @@ def get_db():
     finally:
         db.close()
 
+def store_image(db, data):
+    # Images are keyed by their content, storing one again only returns its id
+    image_id = hashlib.sha256(data.encode()).hexdigest()
+    db.execute(insert(Image).values(id=image_id, data=data).on_conflict_do_nothing(index_elements=[Image.id]))
+    return image_id
+
+def card_references(db, *criteria):
+    # Only what a client needs to address the cards, the image data stays behind its imageId
+    rows = db.execute(
+        select(Card.id, Card.localId, Card.kindId, Card.imageId).where(*criteria).order_by(Card.localId)
+    ).mappings()
+    return [dict(row) for row in rows]
+
 @app.get("/")
 def read_root():
     return {"message": "Memory Game Adapter API is running"}
@@ -194,6 +264,27 @@ def delete_game(game_id: int):
         db.close()
 
 
+@app.post("/images")
+def create_image(image: ImageCreate):
+    db = SessionLocal()
+    try:
+        image_id = store_image(db, image.image)
+        db.commit()
+        return {"imageId": image_id}
+    finally:
+        db.close()
+
+@app.get("/images/{image_id}")
+def get_image(image_id: str):
+    db = SessionLocal()
+    try:
+        image = db.query(Image).filter(Image.id == image_id).first()
+        if image is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+        return {"imageId": image.id, "image": image.data}
+    finally:
+        db.close()
+
 @app.get("/cards")
 def get_cards():
     db = SessionLocal()
@@ -216,6 +307,9 @@ def get_card(card_id: int):
 
 @app.post("/cards")
 def create_card(card: CardCreate):
+    if card.image is None and card.imageId is None:
+        raise HTTPException(status_code=400, detail="Card needs an image or an imageId")
+
     db = SessionLocal()
     try:
         new_card = Card(
@@ -223,7 +317,7 @@ def create_card(card: CardCreate):
             gameId=card.gameId,
             flipped=card.flipped,
             ownedBy=card.ownedBy,
-            image=card.image,
+            imageId=card.imageId if card.image is None else store_image(db, card.image),
             kindId=card.kindId
         )
         db.add(new_card)
@@ -250,7 +344,9 @@ def update_card(card_id: int, card_update: CardUpdate):
         if card_update.ownedBy is not None:
             card.ownedBy = card_update.ownedBy
         if card_update.image is not None:
-            card.image = card_update.image
+            card.imageId = store_image(db, card_update.image)
+        elif card_update.imageId is not None:
+            card.imageId = card_update.imageId
         if card_update.kindId is not None:
             card.kindId = card_update.kindId
             
@@ -285,6 +381,78 @@ def get_cards_for_game(game_id: int):
         db.close()
 
 
+@app.post("/games/{game_id}/cards/bulk")
+def create_cards_bulk(game_id: int, request: BulkCardsCreate):
+    if any(card.image is None and card.imageId is None and card.imageIndex is None for card in request.cards):
+        raise HTTPException(status_code=400, detail="Every card needs an image, an imageId or an imageIndex")
+    if any(card.imageIndex is not None and not 0 <= card.imageIndex < len(request.images) for card in request.cards):
+        raise HTTPException(status_code=400, detail="imageIndex must refer to one of the images")
+
+    db = SessionLocal()
+    try:
+        game = db.query(Game).filter(Game.id == game_id).first()
+        if game is None:
+            raise HTTPException(status_code=404, detail="Game not found")
+
+        # Each distinct image is stored once, however many cards show it
+        images = set(request.images) | {card.image for card in request.cards if card.image is not None}
+        image_ids = {data: store_image(db, data) for data in images}
+
+        def image_id(card):
+            if card.imageIndex is not None:
+                return image_ids[request.images[card.imageIndex]]
+            return card.imageId if card.image is None else image_ids[card.image]
+
+        rows = [
+            {
+                "localId": card.localId,
+                "gameId": game_id,
+                "flipped": card.flipped,
+                "ownedBy": card.ownedBy,
+                "imageId": image_id(card),
+                "kindId": card.kindId
+            }
+            for card in request.cards
+        ]
+        # One multi-row INSERT for all cards, in the same transaction as their images
+        card_ids = db.scalars(insert(Card).returning(Card.id), rows).all() if rows else []
+        db.commit()
+
+        return {"cards": card_references(db, Card.id.in_(card_ids))}
+    finally:
+        db.close()
+
+
+@app.put("/games/{game_id}/cards/positions")
+def update_card_positions(game_id: int, request: CardPositionsUpdate):
+    db = SessionLocal()
+    try:
+        card_ids = set(db.scalars(select(Card.id).where(Card.gameId == game_id)).all())
+        if not card_ids:
+            raise HTTPException(status_code=404, detail="Game not found")
+
+        # Only a full permutation keeps every position taken exactly once
+        if {position.id for position in request.positions} != card_ids or \
+                sorted(position.localId for position in request.positions) != list(range(len(card_ids))):
+            raise HTTPException(status_code=400, detail="Positions must be a permutation of all cards of the game")
+
+        # UPDATE ... FROM (VALUES ...), all positions in one statement
+        positions = values(column("id", Integer), column("localId", Integer), name="positions").data(
+            [(position.id, position.localId) for position in request.positions]
+        )
+        db.execute(
+            update(Card)
+            .where(Card.id == positions.c.id, Card.gameId == game_id)
+            .values(localId=positions.c.localId)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+        return {"cards": card_references(db, Card.gameId == game_id)}
+    finally:
+        db.close()
+
+
 @app.get("/game_state/{game_id}")
 def get_game_state(game_id: int):
     db = SessionLocal()
@@ -409,51 +577,53 @@ def move_cards_to_player(request: MoveCardsRequest):
         db.close()
 
 @app.get("/users/{user_id}/games")
-def get_user_games(user_id: str):
+def get_user_games(user_id: str, limit: int = 50, cursor: Optional[int] = None):
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
     db = SessionLocal()
     try:
+        # One page of the user's games, newest first, continuing below the cursor game id
+        page = select(Game.id, Game.size, Game.winner).where(Game.userId == user_id)
+        if cursor is not None:
+            page = page.where(Game.id < cursor)
+        page = page.order_by(Game.id.desc()).limit(limit).subquery()
+
+        # Owned cards of the page summarized per game in the same query, card images are never read
+        player1 = Card.ownedBy.is_(False)
+        player2 = Card.ownedBy.is_(True)
+        rows = db.execute(
+            select(
+                page.c.id,
+                page.c.size,
+                page.c.winner,
+                func.count(Card.id).filter(player1).label("player1_count"),
+                func.count(Card.id).filter(player2).label("player2_count"),
+                func.array_agg(distinct(Card.kindId)).filter(player1).label("player1_kinds"),
+                func.array_agg(distinct(Card.kindId)).filter(player2).label("player2_kinds")
+            )
+            .select_from(page)
+            .outerjoin(Card, and_(Card.gameId == page.c.id, Card.ownedBy.is_not(None)))
+            .group_by(page.c.id, page.c.size, page.c.winner)
+            .order_by(page.c.id.desc())
+        ).all()
 
-        games = db.query(Game).filter(Game.userId == user_id).all()
-
-        
-        result = {
-            "games": []
-        }
-        
-        for game in games:
+        games = [
+            {
+                "gameId": row.id,
+                "size": row.size,
+                "winner": row.winner,
+                "player1Count": row.player1_count,
+                "player2Count": row.player2_count,
+                "player1KindIds": sorted(row.player1_kinds or []),
+                "player2KindIds": sorted(row.player2_kinds or [])
+            }
+            for row in rows
+        ]
 
-            cards = db.query(Card).filter(Card.gameId == game.id).all()
-            
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = rows[-1].id
 
-            player1_cards = []
-            player2_cards = []
-            
-            for card in cards:
-                card_data = {
-                    "id": card.id,
-                    "localId": card.localId,
-                    "flipped": card.flipped,
-                    "image": card.image,
-                    "kindId": card.kindId,
-                    "ownedBy": card.ownedBy
-                }
-                
-                if card.ownedBy is False:
-                    player1_cards.append(card_data)
-                elif card.ownedBy is True:
-                    player2_cards.append(card_data)
-            
-            game_data = {
-                "gameId": game.id,
-                "size": game.size,
-                "winner": game.winner,
-                "player1Cards": player1_cards,
-                "player2Cards": player2_cards
-            }
-            
-            result["games"].append(game_data)
-        
-        return result
+        return {"games": games, "nextCursor": next_cursor}
     finally:
         db.close()
 
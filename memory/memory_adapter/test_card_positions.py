@@ -0,0 +1,84 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+import main
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The validation runs before any PostgreSQL-only SQL, a SQLite file with the game tables is enough
+    engine = create_engine(f"sqlite:///{tmp_path / 'cards.db'}")
+    main.Base.metadata.create_all(engine, tables=[main.Image.__table__, main.Card.__table__])
+    # SQLite has no UUID type, the games table is declared by hand
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE games (id INTEGER PRIMARY KEY, "userId" VARCHAR, size INTEGER, winner VARCHAR, "currentTurn" BOOLEAN)'))
+        connection.execute(text("INSERT INTO games VALUES (1, '00000000-0000-0000-0000-000000000001', 2, NULL, 0)"))
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(main, "SessionLocal", session_factory)
+
+    with session_factory() as db:
+        db.add(main.Image(id="image", data="data"))
+        db.add_all(main.Card(id=i + 1, localId=i, gameId=1, flipped=False, imageId="image", kindId=i // 2) for i in range(4))
+        db.commit()
+
+    return TestClient(main.app)
+
+def positions(pairs):
+    return {"positions": [{"id": card_id, "localId": local_id} for card_id, local_id in pairs]}
+
+def test_unknown_game_is_404(client):
+    response = client.put("/games/2/cards/positions", json=positions([(1, 0)]))
+
+    assert response.status_code == 404
+
+def test_positions_of_other_cards_are_rejected(client):
+    response = client.put("/games/1/cards/positions", json=positions([(1, 0), (2, 1), (3, 2), (5, 3)]))
+
+    assert response.status_code == 400
+
+def test_missing_cards_are_rejected(client):
+    response = client.put("/games/1/cards/positions", json=positions([(1, 0), (2, 1), (3, 2)]))
+
+    assert response.status_code == 400
+
+def test_duplicate_positions_are_rejected(client):
+    response = client.put("/games/1/cards/positions", json=positions([(1, 0), (2, 0), (3, 2), (4, 3)]))
+
+    assert response.status_code == 400
+
+def test_unknown_image_is_404(client):
+    response = client.get("/images/missing")
+
+    assert response.status_code == 404
+
+def test_card_without_image_is_rejected(client):
+    response = client.post("/cards", json={"localId": 4, "gameId": 1, "flipped": False, "kindId": 2})
+
+    assert response.status_code == 400
+
+def test_bulk_cards_are_returned_without_image_data(client, monkeypatch):
+    # SQLite can't upsert through the PostgreSQL dialect, the stored images are already in place
+    monkeypatch.setattr(main, "store_image", lambda db, data: "image")
+
+    response = client.post("/games/1/cards/bulk", json={"cards": [{"localId": 4, "image": "data", "kindId": 2}]})
+
+    assert response.status_code == 200
+    assert response.json() == {"cards": [{"id": 5, "localId": 4, "kindId": 2, "imageId": "image"}]}
+
+def test_bulk_cards_share_the_images_of_the_request(client, monkeypatch):
+    stored = []
+    monkeypatch.setattr(main, "store_image", lambda db, data: stored.append(data) or "image")
+
+    response = client.post("/games/1/cards/bulk", json={
+        "images": ["data"],
+        "cards": [{"localId": 4, "imageIndex": 0, "kindId": 2}, {"localId": 5, "imageIndex": 0, "kindId": 2}]
+    })
+
+    assert response.status_code == 200
+    assert stored == ["data"]
+    assert [card["imageId"] for card in response.json()["cards"]] == ["image", "image"]
+
+def test_bulk_image_index_out_of_range_is_rejected(client):
+    response = client.post("/games/1/cards/bulk", json={"images": ["data"], "cards": [{"localId": 4, "imageIndex": 1, "kindId": 2}]})
+
+    assert response.status_code == 400
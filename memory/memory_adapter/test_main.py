@@ -0,0 +1,53 @@
+import os
+import uuid
+import pytest
+
+# EXPLAIN plans are PostgreSQL's, run with DATABASE_URL pointing at a scratch database
+if not os.getenv("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("needs a PostgreSQL DATABASE_URL", allow_module_level=True)
+
+import asyncio
+import json
+from sqlalchemy import text
+import main
+
+USER_ID = str(uuid.uuid4())
+
+@pytest.fixture(scope="module")
+def db():
+    asyncio.run(main.startup_event())
+    session = main.SessionLocal()
+    image_id = main.store_image(session, "test-image")
+    for _ in range(50):
+        game = main.Game(userId=str(uuid.uuid4()), size=4, currentTurn=True)
+        session.add(game)
+        session.flush()
+        session.add_all(
+            main.Card(localId=i, gameId=game.id, flipped=False, imageId=image_id, kindId=i // 2)
+            for i in range(8)
+        )
+    session.commit()
+    # The test tables are tiny, make the planner show which index it would use on real ones
+    session.execute(text("SET enable_seqscan = off"))
+    yield session
+    session.rollback()
+    session.close()
+
+def plan(db, query):
+    sql = str(query.statement.compile(dialect=main.engine.dialect, compile_kwargs={"literal_binds": True}))
+    return json.dumps(db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar())
+
+def test_game_state_reads_cards_through_game_index(db):
+    query = db.query(main.Card).filter(main.Card.gameId == 1).order_by(main.Card.localId)
+
+    assert "cards_game_local" in plan(db, query)
+
+def test_move_cards_uses_kind_index(db):
+    query = db.query(main.Card).filter(main.Card.kindId == 1, main.Card.gameId == 1, main.Card.ownedBy == None)
+
+    assert "cards_game_kind_owner" in plan(db, query)
+
+def test_user_games_use_user_index(db):
+    query = db.query(main.Game.id).filter(main.Game.userId == USER_ID, main.Game.id < 1000).order_by(main.Game.id.desc()).limit(50)
+
+    assert "games_user_recent" in plan(db, query)
@@ -48,6 +48,7 @@ def strip_private_info(game_state: dict) -> dict:
         if not card.get("flipped", False):
             card.pop("image", None)
             card.pop("kindId", None)
+            card.pop("imageId", None)
 
     return stripped_state
 
@@ -80,7 +81,11 @@ async def create_game(request: CreateGameRequest):
             
             game_data = game_response.json()["game"]
             game_id = game_data["id"]
+            images = []
             cards = []
+            # Cards are created at shuffled positions, so localId already matches visual order
+            positions = list(range(request.size * 2))
+            random.shuffle(positions)
             for pair_id in range(request.size):
                 # Get an image for this pair
                 image_response = await client.get(f"{IMAGE_ADAPTER_URL}/image/base64")
@@ -91,38 +96,28 @@ async def create_game(request: CreateGameRequest):
                         detail=f"Failed to get image: {image_response.text}"
                     )
                 
-                image_data = image_response.json()["image"]
+                # Sent once in the bulk request, both cards of the pair reference it by index
+                images.append(image_response.json()["image"])
                 
                 for card_in_pair in range(2):
-                    local_id = pair_id * 2 + card_in_pair
-                    card_data = {
-                        "localId": local_id,
-                        "gameId": game_id,
+                    cards.append({
+                        "localId": positions[pair_id * 2 + card_in_pair],
                         "flipped": False,
-                        "image": image_data,
+                        "ownedBy": None,
+                        "imageIndex": pair_id,
                         "kindId": pair_id
-                    }
-                    card_data["ownedBy"] = None
-                    card_response = await client.post(
-                        f"{MEMORY_ADAPTER_URL}/cards",
-                        json=card_data
-                    )
+                    })
 
-                    if card_response.status_code != 200:
-                        raise HTTPException(
-                            status_code=500,
-                            detail=f"Failed to create card: {card_response.text}"
-                        )
-                    
-                    card_data = card_response.json()["card"]
-                    cards.append(card_data)
-            
-            # Shuffle then persist new positions so localId matches visual order
-            random.shuffle(cards)
-            for index, card in enumerate(cards):
-                await client.put(
-                    f"{MEMORY_ADAPTER_URL}/cards/{card['id']}",
-                    json={"localId": index}
+            # All cards of the game in one request and one transaction
+            cards_response = await client.post(
+                f"{MEMORY_ADAPTER_URL}/games/{game_id}/cards/bulk",
+                json={"images": images, "cards": cards}
+            )
+
+            if cards_response.status_code != 200:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Failed to create cards: {cards_response.text}"
                 )
 
             game_state_response = await client.get(f"{MEMORY_ADAPTER_URL}/game_state/{game_id}")
@@ -296,10 +291,13 @@ async def get_game_status(game_id: int):
         )
 
 @app.get("/user_games/{user_id}")
-async def get_user_games(user_id: str):
+async def get_user_games(user_id: str, limit: int = 50, cursor: Optional[int] = None):
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.get(f"{MEMORY_ADAPTER_URL}/users/{user_id}/games")
+            params = {"limit": limit}
+            if cursor is not None:
+                params["cursor"] = cursor
+            response = await client.get(f"{MEMORY_ADAPTER_URL}/users/{user_id}/games", params=params)
             
             if response.status_code != 200:
                 raise HTTPException(
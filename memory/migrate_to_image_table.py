@@ -0,0 +1,83 @@
+"""
+Migration script to move card images into the content-addressed images table.
+Run this script after updating the code to store images by hash.
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+
+# Load database connection details
+load_dotenv()
+
+# Database connection
+DB_HOST = os.getenv("DB_HOST", "bigcasino-memory_db-1")
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_NAME = os.getenv("DB_NAME", "memory_db")
+DB_USER = os.getenv("DB_USER", "postgres")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
+
+# Same key as the adapter computes: SHA-256 of the base64 text, hex encoded
+IMAGE_HASH = "encode(sha256(convert_to(image, 'UTF8')), 'hex')"
+
+def move_images():
+    """Store every distinct card image once and point the cards at it"""
+    try:
+        conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        conn.autocommit = False
+
+        print("Connected to database successfully")
+
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'cards' AND column_name = 'image'
+            """)
+            if cursor.fetchone() is None:
+                print("Cards already reference the images table, nothing to do")
+                conn.close()
+                return
+
+            print("Copying distinct images...")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS images (
+                    id VARCHAR(64) PRIMARY KEY,
+                    data TEXT NOT NULL
+                )
+            """)
+            cursor.execute(f"""
+                INSERT INTO images (id, data)
+                SELECT DISTINCT {IMAGE_HASH}, image FROM cards
+                ON CONFLICT (id) DO NOTHING
+            """)
+            print(f"{cursor.rowcount} distinct image(s) stored")
+
+            print("Pointing cards at their images...")
+            cursor.execute('ALTER TABLE cards ADD COLUMN IF NOT EXISTS "imageId" VARCHAR(64) REFERENCES images(id)')
+            cursor.execute(f'UPDATE cards SET "imageId" = {IMAGE_HASH} WHERE "imageId" IS NULL')
+            print(f"{cursor.rowcount} card(s) updated")
+            cursor.execute('ALTER TABLE cards ALTER COLUMN "imageId" SET NOT NULL')
+            cursor.execute("ALTER TABLE cards DROP COLUMN image")
+            conn.commit()
+            print("Images moved successfully")
+
+        conn.close()
+        print("Database connection closed")
+        print("\n✅ Migration completed successfully!")
+        print("Please restart the memory services:")
+        print("  - docker restart bigcasino-memory_adapter-1")
+        print("  - docker restart bigcasino-memory_logic-1")
+
+    except Exception as e:
+        print(f"\n❌ Error during migration: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    move_images()
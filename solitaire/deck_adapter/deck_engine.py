@@ -0,0 +1,127 @@
+from upstream import CircuitOpenError, LatencyHistogram
+from requests.adapters import HTTPAdapter
+import requests
+import time
+import secrets
+import string
+
+REMOTE_API_URL = "https://deckofcardsapi.com/api/deck"
+IMAGE_URL = "https://deckofcardsapi.com/static/img"
+
+VALUES = ["ACE", "2", "3", "4", "5", "6", "7", "8", "9", "10", "JACK", "QUEEN", "KING"]
+SUITS = ["SPADES", "DIAMONDS", "CLUBS", "HEARTS"]
+
+DECK_ID_ALPHABET = string.ascii_lowercase + string.digits
+
+# Cryptographically secure source for deck ids and shuffles, decks must not be predictable
+random = secrets.SystemRandom()
+
+def make_card(value, suit):
+    """
+    Build a card with the same fields the Deck of Cards API returns
+    """
+    code = ("0" if value == "10" else value[0]) + suit[0]
+    # The Deck of Cards API serves the ace of diamonds png under its own name
+    png = f"{IMAGE_URL}/aceDiamonds.png" if code == "AD" else f"{IMAGE_URL}/{code}.png"
+    return {
+        "code": code,
+        "image": png,
+        "images": {
+            "svg": f"{IMAGE_URL}/{code}.svg",
+            "png": png
+        },
+        "value": value,
+        "suit": suit
+    }
+
+FULL_DECK = [make_card(value, suit) for suit in SUITS for value in VALUES]
+
+def klondike_layout(cards):
+    """
+    Split 52 cards the way successive draws of 1 to 7 cards and then 24 would
+    """
+    tableau = []
+    start = 0
+    for column in range(7):
+        tableau.append(cards[start:start + column + 1])
+        start += column + 1
+    return tableau, cards[start:]
+
+def new_deck_id():
+    return "".join(secrets.choice(DECK_ID_ALPHABET) for _ in range(12))
+
+def shuffled_deck():
+    cards = [dict(card, images=dict(card["images"])) for card in FULL_DECK]
+    random.shuffle(cards)
+    return cards
+
+class LocalDeckBackend:
+    """
+    Generates and shuffles decks in-process
+    """
+    def fresh_deck(self):
+        """
+        Return the id and the 52 shuffled cards of a new deck
+        """
+        return new_deck_id(), shuffled_deck()
+
+class RemoteDeckBackend:
+    """
+    Shuffles decks on the Deck of Cards API and draws them whole, later draws are served locally
+
+    Calls share a keep-alive connection pool, fail after strict timeouts and
+    are not retried here, the circuit breaker and the fallback take over.
+    """
+    def __init__(self, api_url=REMOTE_API_URL, max_connections=10, connect_timeout=2.0, read_timeout=5.0):
+        self.api_url = api_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.latency = LatencyHistogram()
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, max_retries=0))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, max_retries=0))
+
+    def get(self, path):
+        start = time.monotonic()
+        try:
+            response = self.session.get(f"{self.api_url}{path}", timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        finally:
+            self.latency.observe(time.monotonic() - start)
+
+    def fresh_deck(self):
+        deck = self.get("/new/shuffle/?deck_count=1")
+        data = self.get(f"/{deck['deck_id']}/draw/?count=52")
+        if len(data.get("cards", [])) != 52:
+            raise Exception(f"Failed to draw deck {deck['deck_id']} from the Deck of Cards API")
+        return deck["deck_id"], data["cards"]
+
+    def metrics(self):
+        return {"latency": self.latency.metrics()}
+
+class FailoverDeckBackend:
+    """
+    Takes decks from the primary backend behind a circuit breaker, shuffles locally when it fails or the breaker is open
+    """
+    def __init__(self, primary, fallback, breaker):
+        self.primary = primary
+        self.fallback = fallback
+        self.breaker = breaker
+        self.fallbacks = 0
+
+    def fresh_deck(self):
+        try:
+            return self.breaker.call(self.primary.fresh_deck)
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            print(f"Deck provider error, shuffling locally: {e}")
+        self.fallbacks += 1
+        return self.fallback.fresh_deck()
+
+    def metrics(self):
+        return {
+            "breaker": self.breaker.metrics(),
+            "fallbacks": self.fallbacks,
+            **self.primary.metrics()
+        }
@@ -0,0 +1,91 @@
+from collections import deque
+import threading
+import time
+
+class DeckPool:
+    """
+    Ready, fully drawn decks refilled by a background thread
+
+    `/new_deck` pops a deck in O(1) and only falls back to shuffling inline
+    (a miss) when the pool has run dry. Refills are paced to `refill_rate`
+    decks per second so a remote provider is never hammered.
+    """
+    def __init__(self, backend, size=32, refill_rate=20.0, retry_interval=1.0):
+        self.backend = backend
+        self.size = size
+        self.refill_rate = refill_rate
+        self.retry_interval = retry_interval
+
+        self.ready = deque()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.refilled = 0
+        self.refill_errors = 0
+        # Refill timestamps of the last minute, for the observed refill rate
+        self.refill_times = deque()
+
+    def take(self):
+        """
+        Return the (deck_id, cards) of a ready deck, shuffling one inline when the pool is empty
+        """
+        try:
+            deck = self.ready.popleft()
+            self.hits += 1
+        except IndexError:
+            self.misses += 1
+            deck = self.backend.fresh_deck()
+        self.wakeup.set()
+        return deck
+
+    def start(self):
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="deck-pool", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while not self.stopping.is_set():
+            if len(self.ready) >= self.size:
+                self.wakeup.wait(timeout=1.0)
+                self.wakeup.clear()
+                continue
+
+            try:
+                self.ready.append(self.backend.fresh_deck())
+            except Exception as e:
+                print(f"Deck pool refill error: {e}")
+                self.refill_errors += 1
+                self.stopping.wait(self.retry_interval)
+                continue
+
+            self.refilled += 1
+            now = time.monotonic()
+            self.refill_times.append(now)
+            while self.refill_times and self.refill_times[0] < now - 60:
+                self.refill_times.popleft()
+
+            if self.refill_rate:
+                self.stopping.wait(1.0 / self.refill_rate)
+
+    def metrics(self):
+        now = time.monotonic()
+        recent = sum(1 for t in list(self.refill_times) if t >= now - 60)
+        return {
+            "depth": len(self.ready),
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "refilled": self.refilled,
+            "refill_errors": self.refill_errors,
+            "refill_rate": recent / 60
+        }
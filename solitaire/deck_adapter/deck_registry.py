@@ -0,0 +1,160 @@
+from collections import OrderedDict
+from deck_engine import shuffled_deck
+import json
+import sqlite3
+import threading
+import time
+
+class DeckRegistry:
+    """
+    Cards left in every deck handed out, keyed by deck id
+
+    Decks untouched for `ttl` seconds expire and the least recently used ones
+    are evicted past `max_decks`, so memory stays bounded. With a `path` the
+    decks are also kept in SQLite, draws for in-flight games keep working after
+    a restart. Draws and shuffles are answered like the Deck of Cards API.
+    """
+    def __init__(self, ttl=6 * 3600, max_decks=100000, path=None, clock=time.time):
+        self.ttl = ttl
+        self.max_decks = max_decks
+        self.clock = clock
+        # deck_id -> [cards, last access], least recently used first
+        self.decks = OrderedDict()
+        # Endpoints run on a thread pool, two draws on one deck must not hand out the same cards
+        self.lock = threading.Lock()
+
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS decks (
+                    deck_id TEXT PRIMARY KEY,
+                    cards TEXT NOT NULL,
+                    touched_at REAL NOT NULL
+                )
+            """)
+            self.db.execute("CREATE INDEX IF NOT EXISTS decks_touched ON decks (touched_at)")
+
+    def add(self, deck_id, cards):
+        with self.lock:
+            self.expire()
+            self.store(deck_id, [cards, self.clock()])
+        return {"success": True, "deck_id": deck_id, "remaining": len(cards), "shuffled": True}
+
+    def __contains__(self, deck_id):
+        with self.lock:
+            return self.entry(deck_id) is not None
+
+    def __len__(self):
+        return len(self.decks)
+
+    def remaining(self, deck_id):
+        with self.lock:
+            entry = self.entry(deck_id)
+            return None if entry is None else len(entry[0])
+
+    def draw(self, deck_id, count):
+        """
+        Draw from the top of the deck, raises KeyError for unknown or expired decks
+        """
+        with self.lock:
+            entry = self.entry(deck_id)
+            if entry is None:
+                raise KeyError(deck_id)
+            cards = entry[0]
+            drawn = cards[:count]
+            del cards[:count]
+            remaining = len(cards)
+            self.store(deck_id, entry)
+
+        response = {"success": len(drawn) == count, "deck_id": deck_id, "cards": drawn, "remaining": remaining}
+        if len(drawn) < count:
+            response["error"] = f"Not enough cards remaining to draw {count} additional"
+        return response
+
+    def draw_all(self, deck_id, count):
+        """
+        Draw exactly count cards or none at all, returns None when fewer are left
+        """
+        with self.lock:
+            entry = self.entry(deck_id)
+            if entry is None:
+                raise KeyError(deck_id)
+            cards = entry[0]
+            if len(cards) < count:
+                return None
+            drawn = cards[:count]
+            del cards[:count]
+            self.store(deck_id, entry)
+        return drawn
+
+    def shuffle(self, deck_id):
+        """
+        Return every card to the deck and shuffle it, raises KeyError for unknown or expired decks
+        """
+        cards = shuffled_deck()
+        with self.lock:
+            entry = self.entry(deck_id)
+            if entry is None:
+                raise KeyError(deck_id)
+            entry[0] = cards
+            self.store(deck_id, entry)
+        return {"success": True, "deck_id": deck_id, "remaining": 52, "shuffled": True}
+
+    def entry(self, deck_id):
+        """
+        Look a live deck up and mark it as used, the lock must be held
+        """
+        now = self.clock()
+        entry = self.decks.get(deck_id)
+        if entry is None and self.db is not None:
+            row = self.db.execute("SELECT cards, touched_at FROM decks WHERE deck_id = ?", (deck_id,)).fetchone()
+            if row is not None:
+                entry = [json.loads(row[0]), row[1]]
+                self.decks[deck_id] = entry
+
+        if entry is None:
+            return None
+        if now - entry[1] > self.ttl:
+            self.remove(deck_id)
+            return None
+
+        entry[1] = now
+        self.decks.move_to_end(deck_id)
+        return entry
+
+    def store(self, deck_id, entry):
+        self.decks[deck_id] = entry
+        self.decks.move_to_end(deck_id)
+        if self.db is not None:
+            self.db.execute(
+                "INSERT OR REPLACE INTO decks (deck_id, cards, touched_at) VALUES (?, ?, ?)",
+                (deck_id, json.dumps(entry[0], separators=(",", ":")), entry[1])
+            )
+
+        while len(self.decks) > self.max_decks:
+            self.remove(next(iter(self.decks)))
+
+    def remove(self, deck_id):
+        self.decks.pop(deck_id, None)
+        if self.db is not None:
+            self.db.execute("DELETE FROM decks WHERE deck_id = ?", (deck_id,))
+
+    def expire(self):
+        """
+        Drop the decks untouched for longer than the ttl, oldest first
+        """
+        cutoff = self.clock() - self.ttl
+        while self.decks:
+            deck_id, entry = next(iter(self.decks.items()))
+            if entry[1] >= cutoff:
+                break
+            self.remove(deck_id)
+        if self.db is not None:
+            self.db.execute("DELETE FROM decks WHERE touched_at < ?", (cutoff,))
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
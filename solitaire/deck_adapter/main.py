@@ -1,32 +1,67 @@
 from fastapi import FastAPI, HTTPException
-import requests
+from contextlib import asynccontextmanager
+from deck_engine import FailoverDeckBackend, LocalDeckBackend, RemoteDeckBackend, klondike_layout
+from upstream import CircuitBreaker
+from deck_pool import DeckPool
+from deck_registry import DeckRegistry
+import os
 
-app = FastAPI(title="Solitaire deck adapter", description="Adapter that provides Deck of Cards API functionalities to Solitaire game")
-api_url = "https://deckofcardsapi.com/api/deck"
+# "local" shuffles decks in-process, "remote" shuffles them on deckofcardsapi.com
+DECK_BACKEND = os.getenv("DECK_BACKEND", "local")
 
-DEBUG_DECK = "j3377oca0u0b"
+# Remote provider tuning: pool size, timeouts in seconds, and the breaker that fails over to local shuffles
+DECK_API_MAX_CONNECTIONS = int(os.getenv("DECK_API_MAX_CONNECTIONS", "10"))
+DECK_API_CONNECT_TIMEOUT = float(os.getenv("DECK_API_CONNECT_TIMEOUT", "2"))
+DECK_API_READ_TIMEOUT = float(os.getenv("DECK_API_READ_TIMEOUT", "5"))
+DECK_API_FAILURE_THRESHOLD = int(os.getenv("DECK_API_FAILURE_THRESHOLD", "5"))
+DECK_API_RESET_TIMEOUT = float(os.getenv("DECK_API_RESET_TIMEOUT", "30"))
 
-decks = []
+# Ready decks kept in the pool and how many decks per second the background refill may fetch
+DECK_POOL_SIZE = int(os.getenv("DECK_POOL_SIZE", "32"))
+DECK_POOL_REFILL_RATE = float(os.getenv("DECK_POOL_REFILL_RATE", "20"))
+
+# Decks unused for DECK_TTL seconds expire, at most DECK_REGISTRY_SIZE are kept,
+# a DECK_REGISTRY_PATH keeps them in SQLite across restarts
+DECK_TTL = float(os.getenv("DECK_TTL", str(6 * 3600)))
+DECK_REGISTRY_SIZE = int(os.getenv("DECK_REGISTRY_SIZE", "100000"))
+DECK_REGISTRY_PATH = os.getenv("DECK_REGISTRY_PATH", "")
+
+if DECK_BACKEND == "remote":
+    backend = FailoverDeckBackend(
+        RemoteDeckBackend(
+            max_connections=DECK_API_MAX_CONNECTIONS,
+            connect_timeout=DECK_API_CONNECT_TIMEOUT,
+            read_timeout=DECK_API_READ_TIMEOUT
+        ),
+        LocalDeckBackend(),
+        CircuitBreaker(failure_threshold=DECK_API_FAILURE_THRESHOLD, reset_timeout=DECK_API_RESET_TIMEOUT)
+    )
+else:
+    backend = LocalDeckBackend()
+pool = DeckPool(backend, size=DECK_POOL_SIZE, refill_rate=DECK_POOL_REFILL_RATE)
+
+decks = DeckRegistry(ttl=DECK_TTL, max_decks=DECK_REGISTRY_SIZE, path=DECK_REGISTRY_PATH or None)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    pool.start()
+    yield
+    pool.stop()
+    decks.close()
+
+app = FastAPI(title="Solitaire deck adapter", description="Adapter that provides Deck of Cards API functionalities to Solitaire game", lifespan=lifespan)
 
 @app.get("/new_deck")
 def get_new_deck():
     """
-    Retrive a new shuffled deck of cards from the Deck of Cards API
+    Retrive a new shuffled deck of cards
     """
     print("Getting new deck")
-    response = requests.get(f"{api_url}/new/shuffle/?deck_count=1")
-    deck = response.json()
-
-    #deck = {
-     #   "success":True,
-      #  "deck_id":"v9co4nofwwsv",
-       # "remaining":52,
-        #"shuffled":True
-    #}
+    deck_id, cards = pool.take()
+    deck = decks.add(deck_id, cards)
 
     print(f"Deck received: {deck}")
 
-    decks.append(deck['deck_id'])
     return deck
 
 @app.get("/draw_cards/{deck_id}/{count}")
@@ -34,21 +69,61 @@ def draw_cards(deck_id: str, count: int):
     """
     Draw a specified number of cards from a given deck
     """
-    if deck_id not in decks and deck_id != DEBUG_DECK:
-        raise HTTPException(status_code=404, detail="Item not found")
+    if count < 0:
+        raise HTTPException(status_code=400, detail="Count must not be negative")
 
-    response = requests.get(f"{api_url}/{deck_id}/draw/?count={count}")
+    if deck_id not in decks:
+        raise HTTPException(status_code=404, detail="Item not found")
 
-    return response.json()
+    try:
+        return decks.draw(deck_id, count)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Item not found")
 
 @app.post("/shuffle/{deck_id}")
 def shuffle_deck(deck_id: str):
     """
     Shuffle the specified deck
     """
-    if deck_id not in decks and deck_id != DEBUG_DECK:
+    if deck_id not in decks:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    try:
+        return decks.shuffle(deck_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+@app.get("/deal/klondike/{deck_id}")
+def deal_klondike(deck_id: str):
+    """
+    Deal a whole Klondike layout from a full deck: seven tableau columns of 1 to 7 cards and the 24-card stock
+    """
+    if deck_id not in decks:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    response = requests.get(f"{api_url}/{deck_id}/shuffle/")
+    try:
+        cards = decks.draw_all(deck_id, 52)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    if cards is None:
+        raise HTTPException(status_code=409, detail="Cards have already been drawn from this deck")
+
+    tableau, stock = klondike_layout(cards)
+    return {
+        "success": True,
+        "deck_id": deck_id,
+        "tableau": tableau,
+        "stock": stock,
+        "remaining": 0
+    }
 
-    return response.json()
\ No newline at end of file
+@app.get("/metrics")
+def get_metrics():
+    """
+    Return the deck pool depth, refill rate and miss counts, plus breaker state and latencies of the remote provider
+    """
+    metrics = {"deck_pool": pool.metrics(), "live_decks": len(decks)}
+    if isinstance(backend, FailoverDeckBackend):
+        metrics["deck_provider"] = backend.metrics()
+    return metrics
@@ -0,0 +1,94 @@
+from fastapi.testclient import TestClient
+from deck_engine import LocalDeckBackend, FULL_DECK
+from deck_registry import DeckRegistry
+import main
+
+def test_full_deck_matches_deck_of_cards_api():
+    codes = {card["code"] for card in FULL_DECK}
+
+    assert len(codes) == 52
+    assert {"AS", "0H", "KD", "JC", "QS", "2H"} <= codes
+    ten = next(card for card in FULL_DECK if card["code"] == "0H")
+    assert ten == {
+        "code": "0H",
+        "image": "https://deckofcardsapi.com/static/img/0H.png",
+        "images": {
+            "svg": "https://deckofcardsapi.com/static/img/0H.svg",
+            "png": "https://deckofcardsapi.com/static/img/0H.png"
+        },
+        "value": "10",
+        "suit": "HEARTS"
+    }
+
+def new_deck(registry):
+    deck_id, cards = LocalDeckBackend().fresh_deck()
+    return registry.add(deck_id, cards)["deck_id"]
+
+def test_draws_deal_each_card_once():
+    registry = DeckRegistry()
+    deck_id = new_deck(registry)
+
+    drawn = []
+    for count in range(1, 8):
+        drawn += registry.draw(deck_id, count)["cards"]
+    response = registry.draw(deck_id, 24)
+    drawn += response["cards"]
+
+    assert response["success"] and response["remaining"] == 0
+    assert sorted(card["code"] for card in drawn) == sorted(card["code"] for card in FULL_DECK)
+
+    response = registry.draw(deck_id, 1)
+    assert not response["success"] and response["cards"] == []
+
+def test_decks_are_shuffled_independently():
+    registry = DeckRegistry()
+    orders = set()
+    for _ in range(5):
+        deck_id = new_deck(registry)
+        orders.add(tuple(card["code"] for card in registry.draw(deck_id, 52)["cards"]))
+
+    assert len(orders) == 5
+
+def test_shuffle_returns_every_card():
+    registry = DeckRegistry()
+    deck_id = new_deck(registry)
+    registry.draw(deck_id, 30)
+
+    assert registry.shuffle(deck_id)["remaining"] == 52
+    assert registry.draw(deck_id, 52)["success"]
+
+def test_endpoints_keep_response_shape():
+    client = TestClient(main.app)
+
+    deck = client.get("/new_deck").json()
+    assert deck["success"] and deck["remaining"] == 52 and len(deck["deck_id"]) == 12
+
+    response = client.get(f"/draw_cards/{deck['deck_id']}/3").json()
+    assert len(response["cards"]) == 3 and response["remaining"] == 49
+    assert set(response["cards"][0]) == {"code", "image", "images", "value", "suit"}
+
+    assert client.post(f"/shuffle/{deck['deck_id']}").json()["remaining"] == 52
+    assert client.get("/draw_cards/unknown/3").status_code == 404
+
+def test_deal_klondike_returns_whole_layout():
+    client = TestClient(main.app)
+    deck_id = client.get("/new_deck").json()["deck_id"]
+
+    response = client.get(f"/deal/klondike/{deck_id}")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert [len(column) for column in data["tableau"]] == [1, 2, 3, 4, 5, 6, 7]
+    assert len(data["stock"]) == 24 and data["remaining"] == 0
+    codes = {card["code"] for column in data["tableau"] for card in column} | {card["code"] for card in data["stock"]}
+    assert len(codes) == 52
+
+    assert client.get(f"/deal/klondike/{deck_id}").status_code == 409
+    assert client.get("/deal/klondike/unknown").status_code == 404
+
+def test_negative_draw_count_is_rejected():
+    client = TestClient(main.app)
+    deck_id = client.get("/new_deck").json()["deck_id"]
+
+    assert client.get(f"/draw_cards/{deck_id}/-1").status_code == 400
+    assert client.get(f"/draw_cards/{deck_id}/0").json()["remaining"] == 52
@@ -0,0 +1,52 @@
+import time
+from deck_engine import LocalDeckBackend
+from deck_pool import DeckPool
+
+class FlakyBackend(LocalDeckBackend):
+    def __init__(self, failures):
+        self.failures = failures
+
+    def fresh_deck(self):
+        if self.failures:
+            self.failures -= 1
+            raise Exception("provider down")
+        return super().fresh_deck()
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_empty_pool_counts_a_miss_and_still_deals():
+    pool = DeckPool(LocalDeckBackend(), size=4)
+
+    deck_id, cards = pool.take()
+
+    assert len(cards) == 52
+    assert pool.metrics()["misses"] == 1 and pool.metrics()["hits"] == 0
+
+def test_background_refill_keeps_pool_full():
+    pool = DeckPool(LocalDeckBackend(), size=4, refill_rate=0)
+    pool.start()
+    try:
+        assert wait_for(lambda: pool.metrics()["depth"] == 4)
+        decks = [pool.take() for _ in range(4)]
+        assert len({deck_id for deck_id, _ in decks}) == 4
+        assert pool.metrics()["hits"] == 4
+        assert wait_for(lambda: pool.metrics()["depth"] == 4)
+    finally:
+        pool.stop()
+
+    assert pool.metrics()["refilled"] >= 8
+    assert pool.metrics()["refill_rate"] > 0
+
+def test_refill_retries_after_provider_errors():
+    pool = DeckPool(FlakyBackend(failures=2), size=2, refill_rate=0, retry_interval=0.01)
+    pool.start()
+    try:
+        assert wait_for(lambda: pool.metrics()["depth"] == 2)
+    finally:
+        pool.stop()
+
+    assert pool.metrics()["refill_errors"] == 2
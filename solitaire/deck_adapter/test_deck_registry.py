@@ -0,0 +1,75 @@
+import pytest
+from deck_engine import LocalDeckBackend
+from deck_registry import DeckRegistry
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def add_deck(registry):
+    deck_id, cards = LocalDeckBackend().fresh_deck()
+    registry.add(deck_id, cards)
+    return deck_id
+
+def test_tracks_remaining_cards():
+    registry = DeckRegistry()
+    deck_id = add_deck(registry)
+
+    registry.draw(deck_id, 7)
+
+    assert registry.remaining(deck_id) == 45
+    assert registry.remaining("unknown") is None
+
+def test_unused_decks_expire():
+    clock = FakeClock()
+    registry = DeckRegistry(ttl=60, clock=clock)
+    active = add_deck(registry)
+    idle = add_deck(registry)
+
+    clock.now += 40
+    registry.draw(active, 1)
+    clock.now += 40
+
+    assert active in registry
+    assert idle not in registry
+    with pytest.raises(KeyError):
+        registry.draw(idle, 1)
+
+def test_least_recently_used_decks_are_evicted():
+    registry = DeckRegistry(max_decks=2)
+    first = add_deck(registry)
+    second = add_deck(registry)
+    registry.draw(first, 1)
+    third = add_deck(registry)
+
+    assert len(registry) == 2
+    assert first in registry and third in registry
+    assert second not in registry
+
+def test_persisted_decks_survive_restart(tmp_path):
+    path = str(tmp_path / "decks.db")
+    registry = DeckRegistry(path=path)
+    deck_id = add_deck(registry)
+    drawn = registry.draw(deck_id, 10)["cards"]
+    registry.close()
+
+    restarted = DeckRegistry(path=path)
+    response = restarted.draw(deck_id, 42)
+
+    assert response["success"] and response["remaining"] == 0
+    codes = {card["code"] for card in drawn + response["cards"]}
+    assert len(codes) == 52
+
+def test_expired_decks_are_deleted_from_disk(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "decks.db")
+    registry = DeckRegistry(ttl=60, path=path, clock=clock)
+    old = add_deck(registry)
+    clock.now += 120
+    add_deck(registry)
+    registry.close()
+
+    assert old not in DeckRegistry(ttl=60, path=path, clock=clock)
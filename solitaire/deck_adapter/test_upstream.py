@@ -0,0 +1,87 @@
+import pytest
+from deck_engine import FailoverDeckBackend, LocalDeckBackend
+from upstream import CircuitBreaker, CircuitOpenError, LatencyHistogram
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FailingProvider:
+    def __init__(self):
+        self.calls = 0
+        self.down = True
+
+    def fresh_deck(self):
+        self.calls += 1
+        if self.down:
+            raise TimeoutError("read timed out")
+        return "remote-deck", []
+
+    def metrics(self):
+        return {}
+
+def fail():
+    raise TimeoutError("read timed out")
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=FakeClock())
+
+    for _ in range(3):
+        with pytest.raises(TimeoutError):
+            breaker.call(fail)
+
+    assert breaker.metrics()["state"] == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "not called")
+
+def test_breaker_half_opens_after_reset_timeout():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    with pytest.raises(TimeoutError):
+        breaker.call(fail)
+
+    clock.now = 31
+    # A failed trial opens the breaker again straight away
+    with pytest.raises(TimeoutError):
+        breaker.call(fail)
+    assert breaker.metrics()["state"] == "open"
+
+    clock.now = 62
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.metrics() == {"state": "closed", "consecutive_failures": 0, "times_opened": 2}
+
+def test_half_open_breaker_lets_a_single_trial_through():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    with pytest.raises(TimeoutError):
+        breaker.call(fail)
+    clock.now = 31
+
+    assert breaker.allow()
+    assert not breaker.allow()
+
+def test_failover_shuffles_locally_while_provider_is_down():
+    provider = FailingProvider()
+    backend = FailoverDeckBackend(provider, LocalDeckBackend(), CircuitBreaker(failure_threshold=2, clock=FakeClock()))
+
+    decks = [backend.fresh_deck() for _ in range(10)]
+
+    assert all(len(cards) == 52 for _, cards in decks)
+    # Once the breaker is open the provider is no longer called
+    assert provider.calls == 2
+    assert backend.metrics()["fallbacks"] == 10
+    assert backend.metrics()["breaker"]["state"] == "open"
+
+def test_latency_histogram_is_cumulative():
+    histogram = LatencyHistogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(seconds)
+
+    metrics = histogram.metrics()
+
+    assert metrics["buckets"] == {"0.1": 1, "1.0": 3, "+Inf": 4}
+    assert metrics["count"] == 4
+    assert metrics["sum"] == pytest.approx(4.25)
@@ -0,0 +1,98 @@
+from contextlib import asynccontextmanager
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+import threading
+import time
+
+def async_url(url):
+    """
+    Point a database URL at its asyncio driver, asyncpg for PostgreSQL and aiosqlite for SQLite
+    """
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+class WaitHistogram:
+    """
+    Cumulative histogram of how long requests waited for a pooled connection, in seconds
+    """
+    def __init__(self, buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.maximum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        with self.lock:
+            self.counts[index] += 1
+            self.total += seconds
+            self.maximum = max(self.maximum, seconds)
+
+    def metrics(self):
+        with self.lock:
+            counts = list(self.counts)
+            total = self.total
+            maximum = self.maximum
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"buckets": buckets, "count": cumulative, "sum": total, "max": maximum}
+
+class Database:
+    """
+    Async engine with an explicitly sized, pre-pinged connection pool
+
+    Every transaction records how long it waited for a connection, so pool
+    exhaustion shows up in the metrics before it shows up as timeouts.
+    """
+    def __init__(self, url, pool_size=20, max_overflow=10, pool_timeout=30.0, pool_recycle=1800, echo=False):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.engine = create_async_engine(
+            async_url(url),
+            echo=echo,
+            # Also for SQLite, whose async driver would otherwise open a connection per checkout
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=True
+        )
+        self.wait = WaitHistogram()
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Connection inside a transaction, committed when the block exits without an error
+        """
+        start = time.monotonic()
+        async with self.engine.connect() as connection:
+            self.wait.observe(time.monotonic() - start)
+            async with connection.begin():
+                yield connection
+
+    def metrics(self):
+        pool = self.engine.pool
+        return {
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "wait_seconds": self.wait.metrics()
+        }
+
+    async def dispose(self):
+        await self.engine.dispose()
@@ -1,62 +1,467 @@
 from fastapi import FastAPI, HTTPException
-from models.leaderboard import Base, Leaderboard
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
+from models.leaderboard import Base, Leaderboard, win_ratio
+from models.history import GameRecord, LeaderboardRollup, PERIODS, period_start
+from database import Database
+from rank_index import RankIndex
+from write_combiner import WriteCombiner
+from user_names import UserNames
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateIndex
+from typing import Literal, Optional
+import base64
+import csv
+import datetime
+import io
+import json
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, echo=True)
-Base.metadata.create_all(engine)
+# Connection pool of the async engine, at most DB_POOL_SIZE + DB_MAX_OVERFLOW connections are open at once
+# and a request gives up after waiting DB_POOL_TIMEOUT seconds for one. Connections are replaced after
+# DB_POOL_RECYCLE seconds so none outlives a server or proxy idle timeout
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Log every SQL statement, too slow to leave on under load
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
 
-app = FastAPI(title="Solitaire Leaderboard Service", description="Service to manage the leaderboard for Solitaire game")
+# "direct" commits every increment on its own, "combined" buffers them and writes one bulk upsert
+# every LEADERBOARD_FLUSH_INTERVAL_MS or LEADERBOARD_FLUSH_MAX_ENTRIES increments
+LEADERBOARD_WRITE_MODE = os.getenv("LEADERBOARD_WRITE_MODE", "direct")
+LEADERBOARD_FLUSH_INTERVAL_MS = float(os.getenv("LEADERBOARD_FLUSH_INTERVAL_MS", "50"))
+LEADERBOARD_FLUSH_MAX_ENTRIES = int(os.getenv("LEADERBOARD_FLUSH_MAX_ENTRIES", "500"))
+# "flush_on_ack" answers once the increment is committed, "batched" answers at once and may lose buffered increments on a crash
+LEADERBOARD_WRITE_DURABILITY = os.getenv("LEADERBOARD_WRITE_DURABILITY", "flush_on_ack")
+
+# Auth adapter resolving user ids to display names, names are cached for USER_NAME_TTL seconds
+AUTH_ADAPTER_URL = os.getenv("AUTH_ADAPTER_URL")
+USER_NAME_TTL = float(os.getenv("USER_NAME_TTL", "300"))
+# Seconds lookups are skipped after the auth adapter failed, leaderboard reads go out without names meanwhile
+USER_NAME_RETRY_AFTER = float(os.getenv("USER_NAME_RETRY_AFTER", "5"))
+
+database = Database(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    echo=DB_ECHO
+)
+
+# Order statistics over wins for rank lookups, loaded at startup and kept in sync by the counter endpoints
+ranks = RankIndex(())
+
+user_names = UserNames(AUTH_ADAPTER_URL, ttl=USER_NAME_TTL, retry_after=USER_NAME_RETRY_AFTER)
+
+# Largest page a single ranking query may return
+MAX_PAGE_SIZE = 100
+
+# Rows fetched from the server-side cursor at a time while exporting, bounds the memory an export holds
+EXPORT_BATCH_SIZE = int(os.getenv("LEADERBOARD_EXPORT_BATCH_SIZE", "1000"))
+
+RANKINGS = {
+    "wins": Leaderboard.games_won,
+    "win_ratio": win_ratio,
+    "played": Leaderboard.played_games,
+}
+
+def insert(table):
+    """
+    INSERT supporting ON CONFLICT for the database in use
+    """
+    dialect = sqlite if database.engine.dialect.name == "sqlite" else postgresql
+    return dialect.insert(table)
+
+def counters(row):
+    return {
+        'user_id': row.user_id,
+        'played_games': row.played_games,
+        'games_won': row.games_won
+    }
+
+def now():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+def game_event(action, user_id, game_id, **fields):
+    """
+    History entry of one game, None when the caller did not say which game it was
+    """
+    if game_id is None:
+        return None
+    return {"action": action, "user_id": user_id, "game_id": game_id, "at": now(), **fields}
+
+async def record_rollups(connection, deltas):
+    """
+    Roll counter increments into the current day, week and month
+    """
+    moment = now()
+    rows = [
+        {
+            "period": period,
+            "period_start": period_start(period, moment),
+            "user_id": user_id,
+            "played_games": played_games,
+            "games_won": games_won
+        }
+        for user_id, (played_games, games_won) in deltas.items()
+        if played_games or games_won
+        for period in PERIODS
+    ]
+    if not rows:
+        return
+    statement = insert(LeaderboardRollup).values(rows)
+    await connection.execute(statement.on_conflict_do_update(
+        index_elements=[LeaderboardRollup.period, LeaderboardRollup.period_start, LeaderboardRollup.user_id],
+        set_={
+            "played_games": LeaderboardRollup.played_games + statement.excluded.played_games,
+            "games_won": LeaderboardRollup.games_won + statement.excluded.games_won
+        }
+    ))
+
+async def record_games(connection, events):
+    """
+    Write the per-game history, returns the events that changed it
+
+    The process-centric outbox retries updates whose response got lost, an event
+    that changes nothing is a replay of one already counted. A win may also
+    arrive before the start of its game, it creates the game and the start
+    fills it in later.
+    """
+    started = {}
+    won = {}
+    for event in events:
+        (started if event["action"] == "new_game" else won).setdefault(event["game_id"], event)
+
+    recorded = []
+    if started:
+        statement = insert(GameRecord).values([
+            {"game_id": game_id, "user_id": event["user_id"], "started_at": event["at"], "deal_seed": event.get("deal_seed")}
+            for game_id, event in started.items()
+        ])
+        statement = statement.on_conflict_do_update(
+            index_elements=[GameRecord.game_id],
+            set_={"started_at": statement.excluded.started_at, "deal_seed": statement.excluded.deal_seed},
+            where=and_(GameRecord.started_at.is_(None), GameRecord.user_id == statement.excluded.user_id)
+        ).returning(GameRecord.game_id)
+        recorded += [started[game_id] for game_id in (await connection.execute(statement)).scalars()]
+
+    if won:
+        statement = insert(GameRecord).values([
+            {"game_id": game_id, "user_id": event["user_id"], "started_at": None, "deal_seed": None,
+             "finished_at": event["at"], "result": "won", "moves": event.get("moves")}
+            for game_id, event in won.items()
+        ])
+        statement = statement.on_conflict_do_update(
+            index_elements=[GameRecord.game_id],
+            set_={
+                "finished_at": statement.excluded.finished_at,
+                "result": statement.excluded.result,
+                "moves": statement.excluded.moves
+            },
+            where=and_(GameRecord.finished_at.is_(None), GameRecord.user_id == statement.excluded.user_id)
+        ).returning(GameRecord.game_id)
+        recorded += [won[game_id] for game_id in (await connection.execute(statement)).scalars()]
+    return recorded
+
+async def unreplayed(connection, deltas, events):
+    """
+    Record the games of the events, returns the increments without those of replayed events
+    """
+    recorded = {id(event) for event in await record_games(connection, events)}
+    deltas = {user_id: list(delta) for user_id, delta in deltas.items()}
+    for event in events:
+        if id(event) not in recorded:
+            deltas[event["user_id"]][0 if event["action"] == "new_game" else 1] -= 1
+    return deltas
+
+async def current_counters(connection, user_id):
+    row = (await connection.execute(
+        select(Leaderboard.user_id, Leaderboard.played_games, Leaderboard.games_won).where(Leaderboard.user_id == user_id)
+    )).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"User with id '{user_id}' not found")
+    return counters(row)
+
+def encode_cursor(sort_value, user_id):
+    return base64.urlsafe_b64encode(json.dumps([sort_value, user_id]).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        sort_value, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_value, user_id
+
+async def ranked(order_by, limit, cursor=None):
+    """
+    One page of users ordered by the ranking, best first and ties by user id
+
+    Pages are keyset-paginated on (ranking value, user_id), so every page is a
+    range scan of the ranking's index however deep into the leaderboard it is.
+    """
+    key = RANKINGS[order_by]
+    statement = select(Leaderboard.user_id, Leaderboard.played_games, Leaderboard.games_won, key.label("sort_value"))
+
+    if cursor is not None:
+        sort_value, user_id = decode_cursor(cursor)
+        statement = statement.where(or_(key < sort_value, and_(key == sort_value, Leaderboard.user_id > user_id)))
+
+    statement = statement.order_by(key.desc(), Leaderboard.user_id).limit(limit)
+
+    async with database.transaction() as connection:
+        return (await connection.execute(statement)).all()
+
+async def flush_increments(deltas, events=()):
+    """
+    Apply buffered increments of many users in one upsert, returns the new counters by user
+    """
+    async with database.transaction() as connection:
+        deltas = await unreplayed(connection, deltas, events)
+
+        statement = insert(Leaderboard).values([
+            {"user_id": user_id, "played_games": played_games, "games_won": games_won}
+            for user_id, (played_games, games_won) in deltas.items()
+        ])
+        statement = statement.on_conflict_do_update(
+            index_elements=[Leaderboard.user_id],
+            set_={
+                "played_games": Leaderboard.played_games + statement.excluded.played_games,
+                "games_won": Leaderboard.games_won + statement.excluded.games_won
+            }
+        ).returning(Leaderboard.user_id, Leaderboard.played_games, Leaderboard.games_won)
+
+        rows = (await connection.execute(statement)).all()
+        await record_rollups(connection, deltas)
+
+    for row in rows:
+        ranks.update(row.user_id, row.games_won)
+    return {row.user_id: row for row in rows}
+
+combiner = None
+if LEADERBOARD_WRITE_MODE == "combined":
+    combiner = WriteCombiner(
+        flush_increments,
+        interval=LEADERBOARD_FLUSH_INTERVAL_MS / 1000,
+        max_entries=LEADERBOARD_FLUSH_MAX_ENTRIES,
+        wait_for_flush=LEADERBOARD_WRITE_DURABILITY != "batched"
+    )
+
+async def enrich(entries):
+    # Username lookups block on the auth adapter, keep them off the event loop
+    return await run_in_threadpool(user_names.enrich, entries)
+
+async def combined_increment(user_id, played_games=0, games_won=0, event=None):
+    row = await combiner.add(user_id, played_games, games_won, event)
+    if row is None:
+        return {'user_id': user_id, 'buffered': True}
+    return counters(row)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global ranks
+    async with database.transaction() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        if database.engine.dialect.name == "postgresql":
+            # Game history tables created before wins could arrive ahead of their game
+            await connection.exec_driver_sql("ALTER TABLE solitaire_games ALTER COLUMN started_at DROP NOT NULL")
+        # create_all skips tables that already exist, the ranking indexes are added to them here
+        for index in Leaderboard.__table__.indexes | LeaderboardRollup.__table__.indexes:
+            await connection.execute(CreateIndex(index, if_not_exists=True))
+        ranks = RankIndex(await connection.execute(select(Leaderboard.user_id, Leaderboard.games_won)))
+
+    if combiner is not None:
+        combiner.start()
+    yield
+    if combiner is not None:
+        await combiner.stop()
+    await database.dispose()
+
+app = FastAPI(title="Solitaire Leaderboard Service", description="Service to manage the leaderboard for Solitaire game", lifespan=lifespan)
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Return the state of the database connection pool and how long requests waited for a connection
+    """
+    return {"database": database.metrics()}
 
 @app.get("/leaderboard")
-def get_user_name():
-    with Session(engine) as session:
-        leaderboard = session.execute(select(Leaderboard)).scalars().all()
-        if leaderboard is None:
-            raise HTTPException(status_code=404, detail="No leaderboard data found")
+async def get_user_name(order_by: Literal["wins", "win_ratio", "played"] = "wins", limit: int = 50, cursor: Optional[str] = None):
+    """
+    Return a page of the ranked leaderboard, pass `next_cursor` back as `cursor` for the following page
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = await ranked(order_by, limit, cursor)
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1].sort_value, rows[-1].user_id)
+
+    return {
+        "entries": await enrich([counters(row) for row in rows]),
+        "next_cursor": next_cursor
+    }
+
+@app.get("/leaderboard/top/{k}")
+async def get_top(k: int):
+    """
+    Return the k users with the most wins, for the home screen widget
+    """
+    return await enrich([counters(row) for row in await ranked("wins", max(1, min(k, MAX_PAGE_SIZE)))])
+
+EXPORT_FIELDS = ("user_id", "username", "played_games", "games_won")
+
+async def export_batches(order_by):
+    """
+    Every user in ranking order, in batches read from a server-side cursor
+    """
+    key = RANKINGS[order_by]
+    statement = (
+        select(Leaderboard.user_id, Leaderboard.played_games, Leaderboard.games_won)
+        .order_by(key.desc(), Leaderboard.user_id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    async with database.transaction() as connection:
+        result = await connection.stream(statement)
+        async for rows in result.partitions():
+            yield await enrich([counters(row) for row in rows])
+
+async def export_ndjson(order_by):
+    async for entries in export_batches(order_by):
+        yield "".join(json.dumps(entry) + "\n" for entry in entries)
+
+async def export_csv(order_by):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    async for entries in export_batches(order_by):
+        writer.writerows(entries)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Only the header when the leaderboard is empty
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@app.get("/leaderboard/export")
+async def export_leaderboard(format: Literal["ndjson", "csv"] = "ndjson", order_by: Literal["wins", "win_ratio", "played"] = "wins"):
+    """
+    Stream the whole leaderboard as NDJSON or CSV, memory use does not grow with the number of users
+    """
+    if format == "csv":
+        return StreamingResponse(
+            export_csv(order_by),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=leaderboard.csv"}
+        )
+    return StreamingResponse(export_ndjson(order_by), media_type="application/x-ndjson")
+
+@app.get("/leaderboard/period/{period}")
+async def get_period_top(period: Literal["day", "week", "month"], limit: int = 10):
+    """
+    Return the users with the most wins in the current day, week or month
+    """
+    start = period_start(period, now())
+    statement = (
+        select(LeaderboardRollup.user_id, LeaderboardRollup.played_games, LeaderboardRollup.games_won)
+        .where(LeaderboardRollup.period == period, LeaderboardRollup.period_start == start)
+        .order_by(LeaderboardRollup.games_won.desc(), LeaderboardRollup.user_id)
+        .limit(max(1, min(limit, MAX_PAGE_SIZE)))
+    )
 
-        return leaderboard
+    async with database.transaction() as connection:
+        rows = (await connection.execute(statement)).all()
 
+    return {
+        "period": period,
+        "period_start": start.isoformat(),
+        "entries": await enrich([counters(row) for row in rows])
+    }
 
 @app.post("/new_game/{user_id}")
-def new_game(user_id: str):
-    with Session(engine) as session:
-        leaderboard_user = session.execute(select(Leaderboard).filter(Leaderboard.user_id == user_id)).scalar_one_or_none()
-
-        if leaderboard_user:
-            leaderboard_user.start_new_game()
-            session.commit()
-            return {
-                'user_id': leaderboard_user.user_id,
-                'played_games': leaderboard_user.played_games,
-                'games_won': leaderboard_user.games_won
-            }
-        else:
-            new_leaderboard_user = Leaderboard(user_id=user_id)
-            new_leaderboard_user.start_new_game()
-            session.add(new_leaderboard_user)
-            session.commit()
-            return {
-                'user_id': new_leaderboard_user.user_id,
-                'played_games': 1,
-                'games_won': 0
-            }
+async def new_game(user_id: str, game_id: Optional[str] = None, deal_seed: Optional[str] = None):
+    event = game_event("new_game", user_id, game_id, deal_seed=deal_seed)
+    if combiner is not None:
+        return await combined_increment(user_id, played_games=1, event=event)
+
+    # A single statement, concurrent calls for the same user cannot lose an increment
+    statement = insert(Leaderboard).values(user_id=user_id, played_games=1, games_won=0)
+    statement = statement.on_conflict_do_update(
+        index_elements=[Leaderboard.user_id],
+        set_={"played_games": Leaderboard.played_games + 1}
+    ).returning(Leaderboard.user_id, Leaderboard.played_games, Leaderboard.games_won)
+
+    async with database.transaction() as connection:
+        if event is not None and not await record_games(connection, [event]):
+            # Replay of a game already counted
+            return await current_counters(connection, user_id)
+
+        row = (await connection.execute(statement)).one()
+        await record_rollups(connection, {user_id: [1, 0]})
+
+    ranks.update(row.user_id, row.games_won)
+    return counters(row)
 
 @app.post("/won_game/{user_id}")
-def won_name(user_id: str):
-    with Session(engine) as session:
-        leaderboard_user = session.execute(select(Leaderboard).filter(Leaderboard.user_id == user_id)).scalar_one_or_none()
+async def won_name(user_id: str, game_id: Optional[str] = None, moves: Optional[int] = None):
+    event = game_event("won_game", user_id, game_id, moves=moves)
+    if combiner is not None:
+        if user_id not in ranks and not combiner.pending(user_id):
+            raise HTTPException(status_code=404, detail=f"User with id '{user_id}' not found")
+        return await combined_increment(user_id, games_won=1, event=event)
+
+    statement = (
+        update(Leaderboard)
+        .where(Leaderboard.user_id == user_id)
+        .values(games_won=Leaderboard.games_won + 1)
+        .returning(Leaderboard.user_id, Leaderboard.played_games, Leaderboard.games_won)
+    )
 
-        if leaderboard_user is None:
+    async with database.transaction() as connection:
+        if event is not None and not await record_games(connection, [event]):
+            # Replay of a win already counted
+            return await current_counters(connection, user_id)
+
+        row = (await connection.execute(statement)).one_or_none()
+
+        if row is None:
             raise HTTPException(status_code=404, detail=f"User with id '{user_id}' not found")
 
-        leaderboard_user.won_a_game()
-        session.commit()
-        return {
-            'user_id': leaderboard_user.user_id,
-            'played_games': leaderboard_user.played_games,
-            'games_won': leaderboard_user.games_won
-        }
\ No newline at end of file
+        await record_rollups(connection, {user_id: [0, 1]})
+
+    ranks.update(row.user_id, row.games_won)
+    return counters(row)
+
+@app.get("/rank/{user_id}")
+def get_rank(user_id: str):
+    """
+    Return the rank of a user by wins, users with as many wins share a rank
+    """
+    rank = ranks.rank(user_id)
+    if rank is None:
+        raise HTTPException(status_code=404, detail=f"User with id '{user_id}' not found")
+
+    return {
+        'user_id': user_id,
+        'rank': rank[0],
+        'games_won': rank[1],
+        'total_users': len(ranks)
+    }
+
+@app.get("/rank/{user_id}/neighbors")
+def get_rank_neighbors(user_id: str, radius: int = 5):
+    """
+    Return the users ranked right above and below a user
+    """
+    neighbors = ranks.neighbors(user_id, max(0, min(radius, MAX_PAGE_SIZE)))
+    if neighbors is None:
+        raise HTTPException(status_code=404, detail=f"User with id '{user_id}' not found")
+
+    return user_names.enrich(neighbors)
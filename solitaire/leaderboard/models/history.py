@@ -0,0 +1,55 @@
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import Date, DateTime, Index, String
+from models.leaderboard import Base
+from typing import Optional
+import datetime
+
+class GameRecord(Base):
+    __tablename__ = "solitaire_games"
+
+    game_id: Mapped[str] = mapped_column(primary_key = True, nullable = False)
+    user_id: Mapped[str] = mapped_column(nullable = False)
+    # Unknown until the new game arrives when its win was delivered first
+    started_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable = True)
+    finished_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable = True)
+    moves: Mapped[Optional[int]] = mapped_column(nullable = True)
+    result: Mapped[Optional[str]] = mapped_column(String(16), nullable = True)
+    deal_seed: Mapped[Optional[str]] = mapped_column(nullable = True)
+
+    __table_args__ = (
+        Index("solitaire_games_user", "user_id", "started_at"),
+    )
+
+class LeaderboardRollup(Base):
+    """
+    Counters of a user over one day, week or month, kept up to date as games are played
+    """
+    __tablename__ = "leaderboard_rollups"
+
+    period: Mapped[str] = mapped_column(String(8), primary_key = True)
+    period_start: Mapped[datetime.date] = mapped_column(Date, primary_key = True)
+    user_id: Mapped[str] = mapped_column(primary_key = True)
+    played_games: Mapped[int] = mapped_column(default = 0, nullable = False)
+    games_won: Mapped[int] = mapped_column(default = 0, nullable = False)
+
+# Top players of a period are a range scan of this index
+Index(
+    "leaderboard_rollups_rank",
+    LeaderboardRollup.period,
+    LeaderboardRollup.period_start,
+    LeaderboardRollup.games_won.desc(),
+    LeaderboardRollup.user_id
+)
+
+PERIODS = ("day", "week", "month")
+
+def period_start(period, moment):
+    """
+    First day of the day, week (starting on monday) or month containing moment
+    """
+    day = moment.date()
+    if period == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
@@ -1,4 +1,5 @@
 from sqlalchemy.orm import mapped_column, DeclarativeBase, Mapped
+from sqlalchemy import Float, Index, cast, func, literal_column
 import uuid
 
 class Base(DeclarativeBase):
@@ -20,4 +21,16 @@ class Leaderboard(Base):
         self.played_games += 1
 
     def won_a_game(self):
-        self.games_won += 1
\ No newline at end of file
+        self.games_won += 1
+
+
+# Share of played games won, the ranking queries must use this exact expression to hit its index
+win_ratio = func.coalesce(
+    cast(Leaderboard.games_won, Float) / cast(func.nullif(Leaderboard.played_games, literal_column("0")), Float),
+    literal_column("0.0")
+)
+
+# One index per ranking, matching its ORDER BY so top-K and keyset pages are index scans
+Index("leaderboard_rank_wins", Leaderboard.games_won.desc(), Leaderboard.user_id)
+Index("leaderboard_rank_played", Leaderboard.played_games.desc(), Leaderboard.user_id)
+Index("leaderboard_rank_win_ratio", win_ratio.desc(), Leaderboard.user_id)
@@ -0,0 +1,159 @@
+import random
+import threading
+
+MAX_LEVEL = 32
+
+class Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        # Number of positions each link skips, the position of the next node minus this one
+        self.width = [1] * level
+
+class SkipList:
+    """
+    Indexable skiplist of sorted keys: insert, remove, rank and select in O(log n)
+    """
+    def __init__(self):
+        self.head = Node(None, MAX_LEVEL)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def search(self, key):
+        """
+        Return the last node of each level before key and how far along each of them is
+        """
+        update = [None] * MAX_LEVEL
+        positions = [0] * MAX_LEVEL
+        node = self.head
+        position = 0
+        for level in reversed(range(MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            update[level] = node
+            positions[level] = position
+        return update, positions
+
+    def insert(self, key):
+        update, positions = self.search(key)
+        level = 1
+        while level < MAX_LEVEL and random.random() < 0.5:
+            level += 1
+
+        node = Node(key, level)
+        # The new node sits right after update[0], at this position
+        position = positions[0] + 1
+        for i in range(level):
+            previous = update[i]
+            node.next[i] = previous.next[i]
+            previous.next[i] = node
+            skipped = position - positions[i]
+            node.width[i] = previous.width[i] - skipped + 1
+            previous.width[i] = skipped
+        for i in range(level, MAX_LEVEL):
+            update[i].width[i] += 1
+        self.size += 1
+
+    def remove(self, key):
+        update, _ = self.search(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+
+        for i in range(len(node.next)):
+            update[i].width[i] += node.width[i] - 1
+            update[i].next[i] = node.next[i]
+        for i in range(len(node.next), MAX_LEVEL):
+            update[i].width[i] -= 1
+        self.size -= 1
+
+    def count_below(self, key):
+        """
+        Number of keys strictly smaller than key
+        """
+        return self.search(key)[1][0]
+
+    def iterate_from(self, index):
+        """
+        Yield the keys starting at the 0-based index
+        """
+        node = self.head
+        position = 0
+        for level in reversed(range(MAX_LEVEL)):
+            while node.next[level] is not None and position + node.width[level] <= index:
+                position += node.width[level]
+                node = node.next[level]
+        node = node.next[0]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+class RankIndex:
+    """
+    Users ordered by wins, answering rank and neighbour queries in O(log n)
+
+    Built from the database at startup and kept up to date by the counter
+    endpoints. Wins only ever grow, so an update carrying fewer wins than the
+    index already has lost a race with a later one and is ignored.
+    """
+    def __init__(self, rows=()):
+        self.wins = {}
+        self.ordered = SkipList()
+        # Endpoints run on a thread pool
+        self.lock = threading.Lock()
+        for user_id, games_won in rows:
+            self.update(user_id, games_won)
+
+    def __len__(self):
+        return len(self.wins)
+
+    def __contains__(self, user_id):
+        return user_id in self.wins
+
+    def update(self, user_id, games_won):
+        with self.lock:
+            current = self.wins.get(user_id)
+            if current is not None:
+                if games_won <= current:
+                    return
+                self.ordered.remove((-current, user_id))
+            self.wins[user_id] = games_won
+            self.ordered.insert((-games_won, user_id))
+
+    def rank(self, user_id):
+        """
+        Return (rank, games_won), users with as many wins share a rank, None for unknown users
+        """
+        with self.lock:
+            games_won = self.wins.get(user_id)
+            if games_won is None:
+                return None
+            return self.ordered.count_below((-games_won, "")) + 1, games_won
+
+    def neighbors(self, user_id, radius):
+        """
+        Return the users ranked up to radius places above and below the user, with their ranks
+        """
+        with self.lock:
+            games_won = self.wins.get(user_id)
+            if games_won is None:
+                return None
+
+            position = self.ordered.count_below((-games_won, user_id))
+            start = max(0, position - radius)
+            entries = []
+            rank = None
+            previous_wins = None
+            for index, (negative_wins, neighbor_id) in enumerate(self.ordered.iterate_from(start), start):
+                if index > position + radius:
+                    break
+                if negative_wins != previous_wins:
+                    rank = self.ordered.count_below((negative_wins, "")) + 1
+                    previous_wins = negative_wins
+                entries.append({"user_id": neighbor_id, "games_won": -negative_wins, "rank": rank})
+            return entries
@@ -0,0 +1,290 @@
+import asyncio
+import functools
+import os
+import tempfile
+
+# The service reads its database from the environment when imported
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'leaderboard.db')}")
+
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+import main
+
+client = TestClient(main.app)
+
+@pytest.fixture(scope="module", autouse=True)
+def started():
+    # Runs the lifespan once, every test shares its event loop and connection pool
+    with client:
+        yield
+
+def call(function, *args, **kwargs):
+    """
+    Run a coroutine function of the service on its event loop
+    """
+    return client.portal.call(functools.partial(function, *args, **kwargs))
+
+def test_new_game_creates_then_increments():
+    user_id = str(uuid.uuid4())
+
+    assert client.post(f"/new_game/{user_id}").json() == {"user_id": user_id, "played_games": 1, "games_won": 0}
+    assert client.post(f"/new_game/{user_id}").json() == {"user_id": user_id, "played_games": 2, "games_won": 0}
+
+def test_won_game_increments_existing_user():
+    user_id = str(uuid.uuid4())
+    client.post(f"/new_game/{user_id}")
+
+    assert client.post(f"/won_game/{user_id}").json() == {"user_id": user_id, "played_games": 1, "games_won": 1}
+
+def test_won_game_for_unknown_user_is_404():
+    assert client.post(f"/won_game/{uuid.uuid4()}").status_code == 404
+
+def test_parallel_increments_are_not_lost():
+    user_id = str(uuid.uuid4())
+    call(main.new_game, user_id)
+
+    async def parallel():
+        await asyncio.gather(
+            *(main.new_game(user_id) for _ in range(300)),
+            *(main.won_name(user_id) for _ in range(200))
+        )
+
+    call(parallel)
+
+    row = call(main.new_game, user_id)
+    assert row["played_games"] == 302
+    assert row["games_won"] == 200
+
+def fill_leaderboard(prefix, counts):
+    for i, (played, won) in enumerate(counts):
+        user_id = f"{prefix}-{i:03d}"
+        for _ in range(played):
+            call(main.new_game, user_id)
+        for _ in range(won):
+            call(main.won_name, user_id)
+
+def test_pages_cover_the_ranking_exactly_once():
+    fill_leaderboard("page", [(3, i % 3) for i in range(25)])
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"order_by": "wins", "limit": 7}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/leaderboard", params=params).json()
+        seen += page["entries"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    ranked = [(-entry["games_won"], entry["user_id"]) for entry in seen]
+    assert ranked == sorted(ranked)
+    assert len({entry["user_id"] for entry in seen}) == len(seen)
+    assert {f"page-{i:03d}" for i in range(25)} <= {entry["user_id"] for entry in seen}
+
+def test_win_ratio_ranking():
+    fill_leaderboard("ratio", [(4, 1), (2, 2), (3, 2)])
+
+    entries = client.get("/leaderboard", params={"order_by": "win_ratio", "limit": 100}).json()["entries"]
+    ratios = [entry["games_won"] / entry["played_games"] for entry in entries]
+
+    assert ratios == sorted(ratios, reverse=True)
+
+def test_top_k_returns_most_wins_first():
+    top = client.get("/leaderboard/top/3").json()
+
+    assert len(top) == 3
+    assert [entry["games_won"] for entry in top] == sorted((entry["games_won"] for entry in top), reverse=True)
+
+def test_invalid_cursor_is_rejected():
+    assert client.get("/leaderboard", params={"cursor": "not-a-cursor"}).status_code == 400
+
+def test_ranking_queries_use_their_index():
+    async def plans():
+        result = {}
+        async with main.database.transaction() as connection:
+            for name, key in main.RANKINGS.items():
+                statement = main.select(main.Leaderboard.user_id).order_by(key.desc(), main.Leaderboard.user_id).limit(10)
+                sql = str(statement.compile(dialect=main.database.engine.dialect, compile_kwargs={"literal_binds": True}))
+                rows = await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")
+                result[name] = " ".join(str(row) for row in rows)
+        return result
+
+    for name, plan in call(plans).items():
+        assert f"leaderboard_rank_{name}" in plan, plan
+
+def test_rank_follows_counter_updates():
+    leader, follower = f"rank-{uuid.uuid4()}", f"rank-{uuid.uuid4()}"
+    top_wins = client.get("/leaderboard/top/1").json()[0]["games_won"]
+    for user_id, wins in ((leader, top_wins + 2), (follower, top_wins + 1)):
+        call(main.new_game, user_id)
+        for _ in range(wins):
+            call(main.won_name, user_id)
+
+    leader_rank = client.get(f"/rank/{leader}").json()
+    follower_rank = client.get(f"/rank/{follower}").json()
+
+    assert leader_rank["rank"] == 1 and leader_rank["games_won"] == top_wins + 2
+    assert follower_rank["rank"] == 2
+    assert leader_rank["total_users"] == len(main.ranks)
+
+    neighbors = client.get(f"/rank/{follower}/neighbors", params={"radius": 1}).json()
+    assert [entry["user_id"] for entry in neighbors[:2]] == [leader, follower]
+
+def test_rank_of_unknown_user_is_404():
+    assert client.get(f"/rank/{uuid.uuid4()}").status_code == 404
+    assert client.get(f"/rank/{uuid.uuid4()}/neighbors").status_code == 404
+
+def test_rank_index_is_rebuilt_from_the_database():
+    async def rebuild():
+        async with main.database.transaction() as connection:
+            return main.RankIndex(await connection.execute(main.select(main.Leaderboard.user_id, main.Leaderboard.games_won)))
+
+    index = call(rebuild)
+    user_id = client.get("/leaderboard/top/1").json()[0]["user_id"]
+
+    assert len(index) == len(main.ranks)
+    assert index.rank(user_id) == main.ranks.rank(user_id)
+
+def test_bulk_flush_upserts_many_users_in_one_statement():
+    existing = f"bulk-{uuid.uuid4()}"
+    new = f"bulk-{uuid.uuid4()}"
+    call(main.new_game, existing)
+
+    rows = call(main.flush_increments, {existing: [2, 1], new: [1, 0]})
+
+    assert (rows[existing].played_games, rows[existing].games_won) == (3, 1)
+    assert (rows[new].played_games, rows[new].games_won) == (1, 0)
+    assert main.ranks.rank(existing)[1] == 1
+
+def test_games_are_recorded_in_history():
+    user_id = f"history-{uuid.uuid4()}"
+    game_id = str(uuid.uuid4())
+
+    client.post(f"/new_game/{user_id}", params={"game_id": game_id, "deal_seed": "deck123"})
+    client.post(f"/won_game/{user_id}", params={"game_id": game_id, "moves": 87})
+    client.post(f"/new_game/{user_id}", params={"game_id": str(uuid.uuid4())})
+
+    async def history():
+        async with main.database.transaction() as connection:
+            return (await connection.execute(
+                main.select(main.GameRecord.__table__).where(main.GameRecord.user_id == user_id).order_by(main.GameRecord.started_at)
+            )).all()
+
+    games = call(history)
+
+    assert len(games) == 2
+    assert (games[0].game_id, games[0].deal_seed, games[0].result, games[0].moves) == (game_id, "deck123", "won", 87)
+    assert games[0].finished_at >= games[0].started_at
+    assert games[1].result is None and games[1].finished_at is None
+
+def test_period_leaderboards_follow_counter_updates():
+    user_id = f"weekly-{uuid.uuid4()}"
+    top = client.get("/leaderboard/period/week", params={"limit": 1}).json()["entries"]
+    wins = (top[0]["games_won"] if top else 0) + 1
+    for _ in range(wins):
+        client.post(f"/new_game/{user_id}")
+        client.post(f"/won_game/{user_id}")
+
+    for period in ("day", "week", "month"):
+        data = client.get(f"/leaderboard/period/{period}", params={"limit": 1}).json()
+        assert data["entries"] == [{"user_id": user_id, "played_games": wins, "games_won": wins, "username": None}]
+
+    assert client.get("/leaderboard/period/year").status_code == 422
+
+def test_period_start():
+    moment = main.datetime.datetime(2026, 10, 15, 13, 30)
+
+    assert main.period_start("day", moment) == main.datetime.date(2026, 10, 15)
+    assert main.period_start("week", moment) == main.datetime.date(2026, 10, 12)
+    assert main.period_start("month", moment) == main.datetime.date(2026, 10, 1)
+
+def test_metrics_report_pool_usage_and_wait_times():
+    client.get("/leaderboard/top/1")
+    database = client.get("/metrics").json()["database"]
+
+    assert database["pool_size"] == main.DB_POOL_SIZE
+    assert database["checked_out"] == 0
+    assert database["wait_seconds"]["count"] > 0
+
+def test_export_streams_every_user_once_in_ranking_order():
+    fill_leaderboard("export", [(2, i % 2) for i in range(5)])
+    response = client.get("/leaderboard/export")
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    entries = [main.json.loads(line) for line in response.text.splitlines()]
+    ranked = [(-entry["games_won"], entry["user_id"]) for entry in entries]
+    assert ranked == sorted(ranked)
+    assert len(entries) == len(main.ranks)
+    assert set(entries[0]) == set(main.EXPORT_FIELDS)
+
+def test_export_as_csv():
+    response = client.get("/leaderboard/export", params={"format": "csv", "order_by": "played"})
+    rows = list(main.csv.DictReader(main.io.StringIO(response.text)))
+
+    assert response.headers["content-type"].startswith("text/csv")
+    assert len(rows) == len(main.ranks)
+    played = [int(row["played_games"]) for row in rows]
+    assert played == sorted(played, reverse=True)
+
+def test_export_reads_the_cursor_in_batches(monkeypatch):
+    batches = []
+
+    async def enrich(entries):
+        batches.append(len(entries))
+        return entries
+
+    monkeypatch.setattr(main, "EXPORT_BATCH_SIZE", 4)
+    monkeypatch.setattr(main, "enrich", enrich)
+    lines = client.get("/leaderboard/export").text.splitlines()
+
+    assert sum(batches) == len(lines) == len(main.ranks)
+    assert max(batches) == 4
+
+def test_replayed_updates_are_counted_once():
+    user_id = f"replay-{uuid.uuid4()}"
+    game_id = str(uuid.uuid4())
+
+    for _ in range(2):
+        started = client.post(f"/new_game/{user_id}", params={"game_id": game_id}).json()
+    for _ in range(2):
+        won = client.post(f"/won_game/{user_id}", params={"game_id": game_id, "moves": 90}).json()
+
+    assert (started["played_games"], started["games_won"]) == (1, 0)
+    assert (won["played_games"], won["games_won"]) == (1, 1)
+    day = client.get("/leaderboard/period/day", params={"limit": 100}).json()["entries"]
+    assert [(entry["played_games"], entry["games_won"]) for entry in day if entry["user_id"] == user_id] == [(1, 1)]
+
+def test_bulk_flush_skips_replayed_events():
+    user_id = f"bulk-replay-{uuid.uuid4()}"
+    game_id = str(uuid.uuid4())
+    started = main.game_event("new_game", user_id, game_id)
+    call(main.flush_increments, {user_id: [1, 0]}, [started])
+
+    replay = main.game_event("new_game", user_id, game_id)
+    won = main.game_event("won_game", user_id, game_id)
+    rows = call(main.flush_increments, {user_id: [1, 2]}, [replay, won, dict(won)])
+
+    assert (rows[user_id].played_games, rows[user_id].games_won) == (1, 1)
+
+def test_win_delivered_before_its_game_is_recorded():
+    user_id = f"early-win-{uuid.uuid4()}"
+    game_id = str(uuid.uuid4())
+    client.post(f"/new_game/{user_id}")
+
+    won = client.post(f"/won_game/{user_id}", params={"game_id": game_id, "moves": 55}).json()
+    started = client.post(f"/new_game/{user_id}", params={"game_id": game_id, "deal_seed": "deck9"}).json()
+    assert client.post(f"/won_game/{user_id}", params={"game_id": game_id}).json()["games_won"] == 1
+
+    async def history():
+        async with main.database.transaction() as connection:
+            return (await connection.execute(
+                main.select(main.GameRecord.__table__).where(main.GameRecord.game_id == game_id)
+            )).one()
+
+    game = call(history)
+    assert won["games_won"] == 1 and started["played_games"] == 2
+    assert (game.result, game.moves, game.deal_seed) == ("won", 55, "deck9")
+    assert game.started_at is not None and game.finished_at is not None
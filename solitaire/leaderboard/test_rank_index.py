@@ -0,0 +1,58 @@
+import random
+from rank_index import RankIndex, SkipList
+
+def test_skiplist_matches_sorted_list():
+    rng = random.Random(7)
+    skiplist = SkipList()
+    reference = []
+    for _ in range(2000):
+        key = rng.randrange(300)
+        if key in reference and rng.random() < 0.5:
+            skiplist.remove(key)
+            reference.remove(key)
+        elif key not in reference:
+            skiplist.insert(key)
+            reference.append(key)
+        reference.sort()
+
+        probe = rng.randrange(300)
+        assert skiplist.count_below(probe) == sum(1 for k in reference if k < probe)
+
+    assert len(skiplist) == len(reference)
+    assert list(skiplist.iterate_from(0)) == reference
+    assert list(skiplist.iterate_from(10)) == reference[10:]
+
+def test_rank_is_shared_on_ties():
+    index = RankIndex([("a", 5), ("b", 3), ("c", 5), ("d", 0)])
+
+    assert index.rank("a") == (1, 5)
+    assert index.rank("c") == (1, 5)
+    assert index.rank("b") == (3, 3)
+    assert index.rank("d") == (4, 0)
+    assert index.rank("missing") is None
+
+def test_updates_move_users_and_ignore_stale_counts():
+    index = RankIndex([("a", 5), ("b", 3)])
+
+    index.update("b", 6)
+    index.update("b", 4)
+    index.update("new", 0)
+
+    assert index.rank("b") == (1, 6)
+    assert index.rank("a") == (2, 5)
+    assert index.rank("new") == (3, 0)
+    assert len(index) == 3
+
+def test_neighbors_around_a_user():
+    index = RankIndex([(f"user-{i}", i) for i in range(20)])
+
+    neighbors = index.neighbors("user-10", radius=2)
+
+    assert neighbors == [
+        {"user_id": "user-12", "games_won": 12, "rank": 8},
+        {"user_id": "user-11", "games_won": 11, "rank": 9},
+        {"user_id": "user-10", "games_won": 10, "rank": 10},
+        {"user_id": "user-9", "games_won": 9, "rank": 11},
+        {"user_id": "user-8", "games_won": 8, "rank": 12},
+    ]
+    assert [entry["user_id"] for entry in index.neighbors("user-19", radius=1)] == ["user-19", "user-18"]
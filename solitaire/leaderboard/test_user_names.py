@@ -0,0 +1,79 @@
+import requests
+from user_names import UserNames
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+class FakeAuthAdapter:
+    def __init__(self, users):
+        self.users = users
+        self.calls = []
+        self.down = False
+
+    def post(self, url, json, timeout):
+        self.calls.append((url, sorted(json["ids"])))
+        if self.down:
+            raise requests.ConnectionError("auth adapter down")
+        return FakeResponse({user_id: self.users[user_id] for user_id in json["ids"] if user_id in self.users})
+
+def make_names(users, clock=None):
+    names = UserNames("http://auth", ttl=60, clock=clock or FakeClock())
+    names.session = FakeAuthAdapter(users)
+    return names
+
+def test_misses_are_resolved_in_one_batch_then_cached():
+    names = make_names({"u1": "alice", "u2": "bob"})
+    entries = [{"user_id": "u1"}, {"user_id": "u2"}, {"user_id": "gone"}]
+
+    names.enrich(entries)
+    names.enrich([{"user_id": "u1"}, {"user_id": "gone"}])
+
+    assert [entry["username"] for entry in entries] == ["alice", "bob", None]
+    assert names.session.calls == [("http://auth/users/lookup", ["gone", "u1", "u2"])]
+
+def test_names_expire_after_ttl():
+    clock = FakeClock()
+    names = make_names({"u1": "alice"}, clock)
+    names.lookup(["u1"])
+    clock.now = 61
+    names.lookup(["u1"])
+
+    assert len(names.session.calls) == 2
+
+def test_auth_adapter_outage_leaves_names_empty_without_caching():
+    clock = FakeClock()
+    names = make_names({"u1": "alice"}, clock)
+    names.session.down = True
+
+    assert names.enrich([{"user_id": "u1"}]) == [{"user_id": "u1", "username": None}]
+
+    names.session.down = False
+    clock.now = 6
+    assert names.lookup(["u1"]) == {"u1": "alice"}
+
+def test_lookups_are_skipped_for_a_while_after_a_failure():
+    clock = FakeClock()
+    names = make_names({"u1": "alice"}, clock)
+    names.session.down = True
+    names.lookup(["u1"])
+
+    names.session.down = False
+    clock.now = 4
+    assert names.lookup(["u1"]) == {}
+    clock.now = 5
+    assert names.lookup(["u1"]) == {"u1": "alice"}
+    assert len(names.session.calls) == 2
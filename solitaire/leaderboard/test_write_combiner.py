@@ -0,0 +1,101 @@
+import asyncio
+import time
+from write_combiner import WriteCombiner
+
+class FakeTable:
+    def __init__(self, fail=0):
+        self.rows = {}
+        self.events = []
+        self.transactions = 0
+        self.fail = fail
+
+    async def flush(self, deltas, events):
+        # A round trip to the database, other increments keep arriving meanwhile
+        await asyncio.sleep(0.001)
+        if self.fail:
+            self.fail -= 1
+            raise Exception("database unavailable")
+        self.transactions += 1
+        self.events.extend(events)
+        for user_id, (played_games, games_won) in deltas.items():
+            row = self.rows.setdefault(user_id, [0, 0])
+            row[0] += played_games
+            row[1] += games_won
+        return {user_id: tuple(self.rows[user_id]) for user_id in deltas}
+
+def test_flush_on_ack_combines_concurrent_increments():
+    table = FakeTable()
+
+    async def main():
+        combiner = WriteCombiner(table.flush, interval=0.05)
+        combiner.start()
+        try:
+            return await asyncio.gather(*(combiner.add(f"user-{i % 10}", played_games=1) for i in range(2000)))
+        finally:
+            await combiner.stop()
+
+    results = asyncio.run(main())
+
+    assert all(result is not None for result in results)
+    assert sum(row[0] for row in table.rows.values()) == 2000
+    assert table.transactions < 100
+
+def test_flushes_early_when_buffer_is_full():
+    table = FakeTable()
+
+    async def main():
+        combiner = WriteCombiner(table.flush, interval=10, max_entries=5)
+        combiner.start()
+        try:
+            start = time.monotonic()
+            await asyncio.gather(*(combiner.add("user", games_won=1) for _ in range(5)))
+            return time.monotonic() - start
+        finally:
+            await combiner.stop()
+
+    assert asyncio.run(main()) < 5
+    assert table.rows["user"] == [0, 5]
+
+def test_batched_mode_acks_at_once_and_flushes_on_stop():
+    table = FakeTable()
+
+    async def main():
+        combiner = WriteCombiner(table.flush, interval=10, wait_for_flush=False)
+        combiner.start()
+        assert await combiner.add("user", played_games=1) is None
+        assert combiner.pending("user")
+        await combiner.stop()
+
+    asyncio.run(main())
+
+    assert table.rows["user"] == [1, 0]
+    assert table.transactions == 1
+
+def test_batched_mode_keeps_increments_of_failed_flushes():
+    table = FakeTable(fail=1)
+
+    async def main():
+        combiner = WriteCombiner(table.flush, interval=0.01, wait_for_flush=False)
+        combiner.start()
+        await combiner.add("user", played_games=1)
+        await asyncio.sleep(0.1)
+        await combiner.stop()
+
+    asyncio.run(main())
+
+    assert table.rows["user"] == [1, 0]
+
+def test_history_events_are_flushed_with_their_increments():
+    table = FakeTable()
+
+    async def main():
+        combiner = WriteCombiner(table.flush, interval=10, wait_for_flush=False)
+        combiner.start()
+        await combiner.add("user", played_games=1, event={"action": "new_game", "game_id": "game"})
+        await combiner.add("user", games_won=1, event={"action": "won_game", "game_id": "game"})
+        await combiner.stop()
+
+    asyncio.run(main())
+
+    assert [event["action"] for event in table.events] == ["new_game", "won_game"]
+    assert table.transactions == 1
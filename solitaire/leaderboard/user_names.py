@@ -0,0 +1,76 @@
+from requests.adapters import HTTPAdapter
+import requests
+import threading
+import time
+
+class UserNames:
+    """
+    Display names of users, resolved in batches through the auth adapter and cached locally
+
+    Misses of a whole leaderboard response cost one `POST /users/lookup` call.
+    When the auth adapter cannot be reached the entries go out without names
+    rather than failing the leaderboard, and no lookups are tried for
+    `retry_after` seconds so reads do not each wait out the timeout.
+    """
+    def __init__(self, base_url, ttl=300.0, max_entries=100000, timeout=(1.0, 2.0), retry_after=5.0, clock=time.monotonic):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.retry_after = retry_after
+        # Monotonic time before which the auth adapter is assumed to be still down
+        self.unavailable_until = 0.0
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.clock = clock
+        # user_id -> (username, fetched at)
+        self.names = {}
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=10))
+
+    def lookup(self, user_ids):
+        """
+        Return the known usernames of the given ids
+        """
+        now = self.clock()
+        found = {}
+        missing = []
+        with self.lock:
+            for user_id in set(user_ids):
+                cached = self.names.get(user_id)
+                if cached is not None and now - cached[1] < self.ttl:
+                    if cached[0] is not None:
+                        found[user_id] = cached[0]
+                else:
+                    missing.append(user_id)
+
+        if missing and self.base_url and now >= self.unavailable_until:
+            fetched = self.fetch(missing)
+            if fetched is None:
+                self.unavailable_until = now + self.retry_after
+            else:
+                with self.lock:
+                    # Unknown ids are cached too, deleted users do not cost a lookup on every read
+                    for user_id in missing:
+                        self.names[user_id] = (fetched.get(user_id), now)
+                    while len(self.names) > self.max_entries:
+                        del self.names[next(iter(self.names))]
+                found.update(fetched)
+        return found
+
+    def fetch(self, user_ids):
+        try:
+            response = self.session.post(f"{self.base_url}/users/lookup", json={"ids": user_ids}, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"Username lookup failed: {e}")
+            return None
+
+    def enrich(self, entries):
+        """
+        Add a `username` to every leaderboard entry, None when it cannot be resolved
+        """
+        names = self.lookup(entry["user_id"] for entry in entries)
+        for entry in entries:
+            entry["username"] = names.get(entry["user_id"])
+        return entries
@@ -0,0 +1,103 @@
+import asyncio
+
+class Batch:
+    def __init__(self):
+        # user_id -> [played games delta, won games delta]
+        self.deltas = {}
+        # Per-game history events that go along with the increments
+        self.events = []
+        self.entries = 0
+        self.done = asyncio.Event()
+        self.results = {}
+        self.error = None
+
+class WriteCombiner:
+    """
+    Accumulates per-user counter increments and writes them in one bulk upsert
+
+    A background task flushes the buffer every `interval` seconds, or sooner
+    once `max_entries` increments are waiting. With `wait_for_flush` a call only
+    returns once its increment is committed (group commit); without it the call
+    returns at once and increments still buffered are lost if the process dies.
+    """
+    def __init__(self, flush, interval=0.05, max_entries=500, wait_for_flush=True):
+        self.flush = flush
+        self.interval = interval
+        self.max_entries = max_entries
+        self.wait_for_flush = wait_for_flush
+
+        self.batch = Batch()
+        self.wakeup = asyncio.Event()
+        self.stopping = False
+        self.task = None
+        self.flushes = 0
+
+    async def add(self, user_id, played_games=0, games_won=0, event=None):
+        """
+        Buffer an increment, returns the committed counters of the user when waiting for the flush
+        """
+        batch = self.batch
+        delta = batch.deltas.setdefault(user_id, [0, 0])
+        delta[0] += played_games
+        delta[1] += games_won
+        if event is not None:
+            batch.events.append(event)
+        batch.entries += 1
+        if batch.entries >= self.max_entries:
+            self.wakeup.set()
+
+        if not self.wait_for_flush:
+            return None
+
+        await batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[user_id]
+
+    def pending(self, user_id):
+        return user_id in self.batch.deltas
+
+    def start(self):
+        self.stopping = False
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        self.stopping = True
+        self.wakeup.set()
+        if self.task is not None:
+            await self.task
+            self.task = None
+
+    async def run(self):
+        while True:
+            if not self.stopping and self.batch.entries < self.max_entries:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+            self.wakeup.clear()
+            batch = self.batch
+            self.batch = Batch()
+            stopping = self.stopping
+
+            if batch.deltas:
+                await self.write(batch)
+            if stopping:
+                return
+
+    async def write(self, batch):
+        try:
+            batch.results = await self.flush(batch.deltas, batch.events)
+            self.flushes += 1
+        except Exception as e:
+            print(f"Leaderboard flush error: {e}")
+            batch.error = e
+            if not self.wait_for_flush:
+                # Nobody is waiting to retry these, put them back for the next flush
+                for user_id, (played_games, games_won) in batch.deltas.items():
+                    delta = self.batch.deltas.setdefault(user_id, [0, 0])
+                    delta[0] += played_games
+                    delta[1] += games_won
+                self.batch.events.extend(batch.events)
+                self.batch.entries += batch.entries
+        batch.done.set()
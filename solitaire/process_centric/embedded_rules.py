@@ -0,0 +1,55 @@
+from solitaire import SolitaireGame
+
+def copy_piles(game_dict):
+    """
+    Copy the pile lists of a game so a rejected move cannot leak into the stored game
+
+    The engine only moves card dicts between piles and replaces tableau entries,
+    it never mutates a card, so the cards themselves can be shared
+    """
+    return {
+        "deck_id": game_dict.get("deck_id"),
+        "tableau": [list(column) for column in game_dict.get("tableau") or []],
+        "foundation": {suit: list(cards) for suit, cards in (game_dict.get("foundation") or {}).items()} or None,
+        "stock": list(game_dict.get("stock") or []),
+        "talon": list(game_dict.get("talon") or [])
+    }
+
+def apply_move(game_dict, move):
+    """
+    Apply a move in-process with the same engine and dispatch as solitaire_logic's /move_card
+
+    `move` is the request body forwarded to solitaire_logic (without the game), the
+    result mirrors its response as a (status, data) pair so both modes share the
+    handling code in main.py
+    """
+    game = SolitaireGame.from_dict(copy_piles(game_dict))
+
+    try:
+        if "column_from" in move and "column_to" in move:
+            game.move_cards_inside_tableau(
+                move["column_from"],
+                move["column_to"],
+                move.get("number_of_cards", 1)
+            )
+        elif "column_from" in move and "suit" in move:
+            game.move_card_to_foundation_from_tableau(
+                move["column_from"],
+                move["suit"]
+            )
+
+            if game.check_win():
+                return 200, {"game": game.to_dict(), "game_status": "won"}
+        elif "suit" in move:
+            game.move_card_to_foundation_from_talon(move["suit"])
+
+            if game.check_win():
+                return 200, {"game": game.to_dict(), "game_status": "won"}
+        elif "column_to" in move:
+            game.move_card_to_tableau_from_talon(move["column_to"])
+        else:
+            return 400, {"detail": "Invalid request parameters"}
+    except Exception as e:
+        return 409, {"detail": str(e)}
+
+    return 200, {"game": game.to_dict(), "game_status": "playing"}
@@ -0,0 +1,221 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+
+# Every log record is framed as <payload length, crc32 of payload> followed by the payload
+RECORD_HEADER = struct.Struct("<II")
+
+# A snapshot ends with <index offset, index length, magic>
+SNAPSHOT_FOOTER = struct.Struct("<QQ8s")
+SNAPSHOT_MAGIC = b"SOLSNAP1"
+
+def encode(data):
+    return json.dumps(data, separators=(",", ":")).encode()
+
+class GameLog:
+    """
+    Append-only segment of accepted game changes
+    """
+    def __init__(self, path, fsync_always=False):
+        self.path = path
+        self.fsync_always = fsync_always
+        self.file = open(path, "ab")
+
+    def append(self, record):
+        payload = encode(record)
+        self.file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        # Hand the record to the OS right away so a process crash or reload cannot lose it
+        self.file.flush()
+        if self.fsync_always:
+            os.fsync(self.file.fileno())
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+def read_log(path):
+    """
+    Return the records of a log segment, truncating the torn tail a crash may have left
+    """
+    records = []
+    with open(path, "r+b") as f:
+        data = f.read()
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            length, crc = RECORD_HEADER.unpack_from(data, offset)
+            start = offset + RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            records.append(json.loads(payload))
+            offset = start + length
+
+        if offset < len(data):
+            f.truncate(offset)
+    return records
+
+def write_snapshot(path, entries):
+    """
+    Atomically write a snapshot from (game_id, version, payload) entries
+    """
+    index = {}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        offset = 0
+        for game_id, version, payload in entries:
+            f.write(payload)
+            index[game_id] = [offset, len(payload), version]
+            offset += len(payload)
+
+        index_payload = encode(index)
+        f.write(index_payload)
+        f.write(SNAPSHOT_FOOTER.pack(offset, len(index_payload), SNAPSHOT_MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+    directory = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+class Snapshot:
+    """
+    Memory-mapped snapshot, games are only decoded when they are first accessed
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        index_offset, index_length, magic = SNAPSHOT_FOOTER.unpack_from(self.map, len(self.map) - SNAPSHOT_FOOTER.size)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a complete game snapshot")
+        self.index = json.loads(self.map[index_offset:index_offset + index_length])
+
+    def raw(self, game_id):
+        offset, length, _ = self.index[game_id]
+        return self.map[offset:offset + length]
+
+    def load(self, game_id):
+        return json.loads(self.raw(game_id))
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+class GameJournal:
+    """
+    Durable history of the game store: numbered log segments plus periodic snapshots
+
+    Snapshot N holds every game as of the moment log segment N was opened, so a
+    restart maps the newest complete snapshot and replays segments N and later.
+    A segment is only deleted once a snapshot covering it is on disk.
+    """
+    def __init__(self, directory, snapshot_every=10000, fsync_always=False):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync_always = fsync_always
+        self.sequence = 0
+        self.log = None
+        self.snapshot = None
+        self.records_since_snapshot = 0
+
+    def path(self, sequence, kind):
+        return os.path.join(self.directory, f"games.{sequence:08d}.{kind}")
+
+    def files(self, kind):
+        sequences = []
+        for name in os.listdir(self.directory):
+            parts = name.split(".")
+            if len(parts) == 3 and parts[0] == "games" and parts[2] == kind and parts[1].isdigit():
+                sequences.append(int(parts[1]))
+        return sorted(sequences)
+
+    def recover(self):
+        """
+        Open the latest snapshot and replay the log tail
+
+        Returns the version of every game and the states of the games changed
+        since the snapshot, games only in the snapshot are left to `load`.
+        """
+        snapshot_sequence = 0
+        for sequence in reversed(self.files("snap")):
+            try:
+                self.snapshot = Snapshot(self.path(sequence, "snap"))
+            except (ValueError, struct.error) as e:
+                print(f"Skipping unreadable game snapshot {sequence}: {e}")
+                continue
+            snapshot_sequence = sequence
+            break
+
+        versions = {}
+        if self.snapshot is not None:
+            versions = {game_id: entry[2] for game_id, entry in self.snapshot.index.items()}
+
+        games = {}
+        log_sequences = self.files("log")
+        for sequence in log_sequences:
+            if sequence < snapshot_sequence:
+                continue
+            for record in read_log(self.path(sequence, "log")):
+                games[record["id"]] = record["game"]
+                versions[record["id"]] = record["version"]
+                self.records_since_snapshot += 1
+
+        # Never append to a segment written by a previous process, its tail may have been torn
+        self.sequence = max(log_sequences + [snapshot_sequence]) + 1
+        self.log = GameLog(self.path(self.sequence, "log"), self.fsync_always)
+        return versions, games
+
+    def load(self, game_id):
+        if self.snapshot is None or game_id not in self.snapshot.index:
+            return None
+        return self.snapshot.load(game_id)
+
+    def record(self, game_id, version, game):
+        self.log.append({"id": game_id, "version": version, "game": game})
+        self.records_since_snapshot += 1
+
+    def snapshot_due(self):
+        return self.records_since_snapshot >= self.snapshot_every
+
+    def rotate(self):
+        """
+        Start a new log segment, its sequence names the snapshot taken at this point
+        """
+        self.log.close()
+        self.sequence += 1
+        self.log = GameLog(self.path(self.sequence, "log"), self.fsync_always)
+        self.records_since_snapshot = 0
+        return self.sequence
+
+    def install_snapshot(self, sequence):
+        """
+        Switch lazy loads to a freshly written snapshot and drop the files it supersedes
+        """
+        previous = self.snapshot
+        self.snapshot = Snapshot(self.path(sequence, "snap"))
+        if previous is not None:
+            previous.close()
+
+        for old in self.files("snap"):
+            if old < sequence:
+                os.remove(self.path(old, "snap"))
+        for old in self.files("log"):
+            if old < sequence:
+                os.remove(self.path(old, "log"))
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+        if self.snapshot is not None:
+            self.snapshot.close()
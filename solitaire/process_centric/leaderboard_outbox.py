@@ -0,0 +1,146 @@
+from upstream import UpstreamError
+import asyncio
+import json
+import sqlite3
+import time
+
+# Statuses worth retrying: the user row may not exist yet, or the adapter is overloaded/down
+RETRIABLE_STATUSES = {404, 408, 429}
+
+class LeaderboardOutbox:
+    """
+    Durable queue of leaderboard updates backed by a SQLite outbox table.
+
+    Gameplay endpoints only append a row and return; a background worker drains
+    the table in batches and replays each update against the leaderboard adapter,
+    backing off exponentially while the adapter is slow or unavailable. An
+    update that still fails after `max_attempts` tries is logged and dropped, so
+    it cannot hold up the updates of its user forever.
+    """
+    def __init__(self, path, upstream, batch_size=50, poll_interval=1.0, retry_base=0.5, retry_max=60.0, max_attempts=20):
+        self.upstream = upstream
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                action TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                params TEXT
+            )
+        """)
+        # Outboxes created before updates carried game details lack the params column
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(outbox)")}
+        if "params" not in columns:
+            self.db.execute("ALTER TABLE outbox ADD COLUMN params TEXT")
+        self.db.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt_at, id)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS outbox_user ON outbox (user_id, id)")
+
+        self.wakeup = None
+        self.task = None
+
+    def enqueue(self, action, user_id, params=None):
+        """
+        Persist an update ("new_game" or "won_game") and wake the worker, params are sent as query string
+        """
+        self.db.execute(
+            "INSERT INTO outbox (action, user_id, params) VALUES (?, ?, ?)",
+            (action, user_id, json.dumps(params) if params else None)
+        )
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def pending(self):
+        return self.db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def start(self):
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        self.db.close()
+
+    async def run(self):
+        while True:
+            try:
+                delivered = await self.drain_once()
+            except Exception as e:
+                print(f"Leaderboard outbox worker error: {e}")
+                delivered = 0
+
+            if delivered < self.batch_size:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def drain_once(self):
+        """
+        Send one batch of due updates, returns how many entries were taken from the outbox
+        """
+        now = time.time()
+        # An update is not due while an older update of the same user is still backing off
+        rows = self.db.execute(
+            """
+            SELECT id, action, user_id, attempts, params FROM outbox
+            WHERE next_attempt_at <= ? AND NOT EXISTS (
+                SELECT 1 FROM outbox AS older
+                WHERE older.user_id = outbox.user_id AND older.id < outbox.id AND older.next_attempt_at > ?
+            )
+            ORDER BY id LIMIT ?
+            """,
+            (now, now, self.batch_size)
+        ).fetchall()
+
+        # Updates of the same user are replayed in order, different users in parallel
+        by_user = {}
+        for row in rows:
+            by_user.setdefault(row[2], []).append(row)
+
+        await asyncio.gather(*(self.deliver(user_rows) for user_rows in by_user.values()))
+        return len(rows)
+
+    async def deliver(self, rows):
+        for entry_id, action, user_id, attempts, params in rows:
+            try:
+                if params:
+                    status, data = await self.upstream.request("POST", f"/{action}/{user_id}", params=json.loads(params))
+                else:
+                    status, data = await self.upstream.request("POST", f"/{action}/{user_id}")
+            except UpstreamError as e:
+                status, data = None, str(e)
+
+            if status == 200:
+                self.db.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+            elif status is None or status >= 500 or status in RETRIABLE_STATUSES:
+                if attempts + 1 >= self.max_attempts:
+                    print(f"Giving up on leaderboard update {action} for {user_id} params={params} after {attempts + 1} attempts: {status} {data}")
+                    self.db.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+                    continue
+                # Later updates of this user stay queued behind this one until it is delivered or dropped
+                delay = min(self.retry_max, self.retry_base * (2 ** attempts))
+                self.db.execute(
+                    "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ? WHERE id = ?",
+                    (time.time() + delay, entry_id)
+                )
+                return
+            else:
+                print(f"Dropping leaderboard update {action} for {user_id}: {status} {data}")
+                self.db.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
@@ -0,0 +1,117 @@
+"""
+Closed-loop load generator for the Solitaire process-centric service.
+
+Opens `--concurrency` keep-alive connections and has each of them send
+authenticated requests back to back until `--requests` have been sent, then
+reports throughput and latency percentiles. It speaks just enough HTTP/1.1 over
+raw asyncio streams to stay cheap, so the service under test and not the load
+generator is what saturates first.
+
+Example:
+    JWT_SECRET_KEY=secret JWT_ALGORITHM=HS256 \\
+        python load_test.py --url http://localhost:8010 --path /leaderboard \\
+        --requests 5000 --concurrency 500
+"""
+import argparse
+import asyncio
+import os
+import time
+from urllib.parse import urlparse
+
+import jwt
+
+
+def make_token(user_id):
+    """
+    Mint a token the service under test will accept
+    """
+    return jwt.encode(
+        {"sub": user_id, "exp": int(time.time()) + 3600},
+        os.getenv("JWT_SECRET_KEY", "secret"),
+        algorithm=os.getenv("JWT_ALGORITHM", "HS256")
+    )
+
+
+async def read_response(reader):
+    """
+    Read one HTTP/1.1 response and return its status code
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed by server")
+
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def run(url, path, method, total, concurrency, user_id):
+    target = urlparse(url)
+    raw_request = (
+        f"{method} {path} HTTP/1.1\r\n"
+        f"Host: {target.netloc}\r\n"
+        f"Authorization: Bearer {make_token(user_id)}\r\n"
+        "Content-Length: 0\r\n"
+        "\r\n"
+    ).encode()
+
+    latencies = []
+    statuses = {}
+    remaining = [total]
+
+    async def worker():
+        reader = writer = None
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(target.hostname, target.port or 80)
+                writer.write(raw_request)
+                status = await read_response(reader)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError) as e:
+                status = type(e).__name__
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+        if writer is not None:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"{method} {path}: {total} requests, concurrency {concurrency}")
+    print(f"  elapsed     {elapsed:.2f} s")
+    print(f"  throughput  {total / elapsed:.1f} req/s")
+    print(f"  latency     p50 {percentile(0.50):.1f} ms, p95 {percentile(0.95):.1f} ms, p99 {percentile(0.99):.1f} ms")
+    print(f"  statuses    {statuses}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Solitaire process-centric service")
+    parser.add_argument("--url", default="http://localhost:8010")
+    parser.add_argument("--path", default="/leaderboard")
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--user-id", default="load-test-user")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.path, args.method.upper(), args.requests, args.concurrency, args.user_id))
@@ -1,16 +1,50 @@
 from pydantic import BaseModel
 from fastapi import FastAPI, HTTPException, Request
-from typing import Union
+from typing import Union, Optional
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from solitaire import SolitaireGame
+from upstream import Upstream, UpstreamError
+from leaderboard_outbox import LeaderboardOutbox
+from embedded_rules import apply_move
+from game_store import GameStore
+from game_log import GameJournal
+from read_cache import ReadCache
 import uuid
-import requests
 import jwt
 import os
 
 load_dotenv()
 
+# "remote" validates moves on solitaire_logic, "embedded" applies them in-process with the same engine
+SOLITAIRE_RULES_MODE = os.getenv("SOLITAIRE_RULES_MODE", "remote")
+
+# Number of locks shared by all the games, bounds memory regardless of how many games are live
+GAME_LOCK_STRIPES = int(os.getenv("GAME_LOCK_STRIPES", "1024"))
+
+# Accepted game changes are logged here and snapshotted every GAME_SNAPSHOT_EVERY records, empty keeps games in memory only
+GAME_LOG_DIR = os.getenv("GAME_LOG_DIR", "game_data")
+GAME_SNAPSHOT_EVERY = int(os.getenv("GAME_SNAPSHOT_EVERY", "10000"))
+GAME_LOG_FSYNC = os.getenv("GAME_LOG_FSYNC", "false").lower() == "true"
+
+# Per-upstream connection pool sizes
+LOGIC_MAX_CONNECTIONS = int(os.getenv("LOGIC_MAX_CONNECTIONS", "100"))
+LEADERBOARD_MAX_CONNECTIONS = int(os.getenv("LEADERBOARD_MAX_CONNECTIONS", "50"))
+
+# Durable queue of leaderboard updates, drained in the background, kept next to the game log so the same volume holds both
+LEADERBOARD_OUTBOX_PATH = os.getenv("LEADERBOARD_OUTBOX_PATH", os.path.join(GAME_LOG_DIR or ".", "leaderboard_outbox.db"))
+LEADERBOARD_OUTBOX_BATCH_SIZE = int(os.getenv("LEADERBOARD_OUTBOX_BATCH_SIZE", "50"))
+LEADERBOARD_RETRY_BASE = float(os.getenv("LEADERBOARD_RETRY_BASE", "0.5"))
+LEADERBOARD_RETRY_MAX = float(os.getenv("LEADERBOARD_RETRY_MAX", "60"))
+# Tries before an update that keeps failing is logged and dropped, about 15 minutes with the default backoff
+LEADERBOARD_MAX_ATTEMPTS = int(os.getenv("LEADERBOARD_MAX_ATTEMPTS", "20"))
+
+# Leaderboard reads are served from cache for LEADERBOARD_CACHE_TTL seconds, then stale for up to
+# LEADERBOARD_CACHE_STALE seconds more while one background call refreshes them
+LEADERBOARD_CACHE_TTL = float(os.getenv("LEADERBOARD_CACHE_TTL", "2"))
+LEADERBOARD_CACHE_STALE = float(os.getenv("LEADERBOARD_CACHE_STALE", "30"))
+
 class MoveCardInsideTableauRequest(BaseModel):
     column_from: int
     column_to: int
@@ -33,7 +67,45 @@ MoveCardRequest = Union [
     MoveCardToFoundationFromTalon
 ]
 
-app = FastAPI(title="Solitaire Process-Centric Service", description="Service that exposes the solitaire game functionalities and provide the leaderboard to the UI")
+upstreams = {
+    "logic": Upstream("logic", os.getenv("LOGIC_LAYER_SERVICE_URL"), LOGIC_MAX_CONNECTIONS),
+    "leaderboard": Upstream("leaderboard", os.getenv("LEADERBOARD_URL"), LEADERBOARD_MAX_CONNECTIONS),
+}
+
+os.makedirs(os.path.dirname(LEADERBOARD_OUTBOX_PATH) or ".", exist_ok=True)
+leaderboard_outbox = LeaderboardOutbox(
+    LEADERBOARD_OUTBOX_PATH,
+    upstreams["leaderboard"],
+    batch_size=LEADERBOARD_OUTBOX_BATCH_SIZE,
+    retry_base=LEADERBOARD_RETRY_BASE,
+    retry_max=LEADERBOARD_RETRY_MAX,
+    max_attempts=LEADERBOARD_MAX_ATTEMPTS
+)
+
+leaderboard_cache = ReadCache(ttl=LEADERBOARD_CACHE_TTL, stale_ttl=LEADERBOARD_CACHE_STALE)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    for upstream in upstreams.values():
+        await upstream.start()
+    leaderboard_outbox.start()
+    games.start()
+    yield
+    await games.stop()
+    await leaderboard_outbox.stop()
+    for upstream in upstreams.values():
+        await upstream.close()
+
+async def call_upstream(name, method, path, **kwargs):
+    """
+    Send a request through the pooled client of an upstream service
+    """
+    try:
+        return await upstreams[name].request(method, path, **kwargs)
+    except UpstreamError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+app = FastAPI(title="Solitaire Process-Centric Service", description="Service that exposes the solitaire game functionalities and provide the leaderboard to the UI", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -43,10 +115,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-games = {}
+games = GameStore(
+    GAME_LOCK_STRIPES,
+    journal=GameJournal(GAME_LOG_DIR, snapshot_every=GAME_SNAPSHOT_EVERY, fsync_always=GAME_LOG_FSYNC) if GAME_LOG_DIR else None
+)
+
+def check_version(game_id, version):
+    """
+    Reject a request built on a state of the game that has since changed
+    """
+    if version is not None and version != games.version(game_id):
+        raise HTTPException(status_code=409, detail=f"Stale game version {version}, current version is {games.version(game_id)}")
 
 @app.post("/create_game")
-def create_game(request: Request):
+async def create_game(request: Request):
     """
     Create a new instance for a solitaire game
     """
@@ -65,31 +147,26 @@ def create_game(request: Request):
     except jwt.InvalidTokenError as e:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    url = os.getenv("LOGIC_LAYER_SERVICE_URL") + "/create_game"
-    response = requests.post(url)
-
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail=response.json()['detail'])
-
-    if user_id:
-        leaderboard_url = os.getenv("LEADERBOARD_URL") + "/new_game/" + user_id
-        leaderboard_response = requests.post(leaderboard_url)
-
-        if leaderboard_response.status_code != 200:
-            raise HTTPException(status_code=leaderboard_response.status_code, detail=leaderboard_response.json()['detail'])
+    status, data = await call_upstream("logic", "POST", "/create_game")
 
-    data = response.json()
+    if status != 200:
+        raise HTTPException(status_code=status, detail=data['detail'])
 
     game_id = str(uuid.uuid4())
-    games[game_id] = SolitaireGame.from_dict(data['game'])
+    game = SolitaireGame.from_dict(data['game'])
+
+    if user_id:
+        leaderboard_outbox.enqueue("new_game", user_id, {"game_id": game_id, "deal_seed": game.deck_id})
+    version = games.put(game_id, game)
     return {
         "game_id": game_id,
-        "game_state": games[game_id].get_game_state(),
-        "game_status": "playing"
+        "game_state": game.get_game_state(),
+        "game_status": "playing",
+        "version": version
     }
 
 @app.post("/draw_cards/{game_id}")
-def draw_cards(request: Request, game_id: str):
+async def draw_cards(request: Request, game_id: str, version: Optional[int] = None):
     """
     Draw cards from the stock pile to talon
     """
@@ -106,22 +183,28 @@ def draw_cards(request: Request, game_id: str):
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    game = games.get(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
+    async with games.lock(game_id):
+        game = games.get(game_id)
+        if not game:
+            raise HTTPException(status_code=404, detail="Game not found")
 
-    try:
-        game.draw_from_stock()
-    except Exception as e:
-        raise HTTPException(status_code=409, detail=str(e))
+        check_version(game_id, version)
+
+        try:
+            game.draw_from_stock()
+        except Exception as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+        version = games.put(game_id, game)
 
     return {
         "game_state": game.get_game_state(),
-        "game_status": "playing"
+        "game_status": "playing",
+        "version": version
     }
 
 @app.post("/reset_stock/{game_id}")
-def reset_stock(request: Request, game_id: str):
+async def reset_stock(request: Request, game_id: str, version: Optional[int] = None):
     """
     Reset the stock pile from the talon
     """
@@ -138,22 +221,28 @@ def reset_stock(request: Request, game_id: str):
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    game = games.get(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
+    async with games.lock(game_id):
+        game = games.get(game_id)
+        if not game:
+            raise HTTPException(status_code=404, detail="Game not found")
 
-    try:
-        game.reload_stock_from_talon()
-    except Exception as e:
-        raise HTTPException(status_code=409, detail=str(e))
+        check_version(game_id, version)
+
+        try:
+            game.reload_stock_from_talon()
+        except Exception as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+        version = games.put(game_id, game)
 
     return {
         "game_state": game.get_game_state(),
-        "game_status": "playing"
+        "game_status": "playing",
+        "version": version
     }
 
 @app.post("/move_card/{game_id}")
-def move_card(request: Request, game_id: str, body: MoveCardRequest):
+async def move_card(request: Request, game_id: str, body: MoveCardRequest, version: Optional[int] = None):
     """
     Move a card from one pile to another
 
@@ -166,6 +255,9 @@ def move_card(request: Request, game_id: str, body: MoveCardRequest):
     Move to tableau from talon: {column_to: int}
 
     Move to foundation from talon: {suit: str}
+
+    Pass the last received `version` as query parameter to get a 409 instead of
+    applying the move when the game has changed in the meantime
     """
     jwt_token = request.headers.get("Authorization")
     if not jwt_token:
@@ -182,38 +274,45 @@ def move_card(request: Request, game_id: str, body: MoveCardRequest):
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    game = games.get(game_id)
-    if not game:
-        raise HTTPException(status_code = 404, detail="Game not found")
+    async with games.lock(game_id):
+        game = games.get(game_id)
+        if not game:
+            raise HTTPException(status_code = 404, detail="Game not found")
 
-    url = os.getenv("LOGIC_LAYER_SERVICE_URL") + "/move_card"
-    json = {
-        "game": game.to_dict(),
-        **body.dict()
-    }
-    response = requests.post(url, json=json)
+        check_version(game_id, version)
+
+        if SOLITAIRE_RULES_MODE == "embedded":
+            status, data = apply_move(game.to_dict(), body.dict())
+        else:
+            json = {
+                "game": game.to_dict(),
+                **body.dict()
+            }
+            status, data = await call_upstream("logic", "POST", "/move_card", json=json)
 
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail=response.json()['detail'])
+        if status != 200:
+            raise HTTPException(status_code=status, detail=data['detail'])
 
-    if response.json().get("game_status") == "won" and user_id:
-        leaderboard_url = os.getenv("LEADERBOARD_URL") + "/won_game/" + user_id
-        leaderboard_response = requests.post(leaderboard_url)
+        if data.get("game_status") == "won" and user_id:
+            # Every accepted change since creation, this winning move included
+            leaderboard_outbox.enqueue("won_game", user_id, {"game_id": game_id, "moves": games.version(game_id)})
 
-        if leaderboard_response.status_code != 200:
-            raise HTTPException(status_code=leaderboard_response.status_code, detail=leaderboard_response.json()['detail'])
+        game = SolitaireGame.from_dict(data['game'])
+        version = games.put(game_id, game)
 
-    data = response.json()
-    games[game_id] = SolitaireGame.from_dict(data['game'])
     return {
-        "game_state": games[game_id].get_game_state(),
-        "game_status": data['game_status']
+        "game_state": game.get_game_state(),
+        "game_status": data['game_status'],
+        "version": version
     }
 
 @app.get("/leaderboard")
-def get_leaderboard(request: Request):
+async def get_leaderboard(request: Request, order_by: str = "wins", limit: int = 50, cursor: Optional[str] = None):
     """
-    Return the leaderboard with stats for all the users
+    Return a page of the ranked leaderboard
+
+    `order_by` is one of wins, win_ratio or played, pass the returned
+    `next_cursor` as `cursor` to get the following page
     """
     jwt_token = request.headers.get("Authorization")
     if not jwt_token:
@@ -228,10 +327,75 @@ def get_leaderboard(request: Request):
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    url = os.getenv("LEADERBOARD_URL") + "/leaderboard"
-    response = requests.get(url)
+    params = {"order_by": order_by, "limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+
+    status, data = await leaderboard_cache.get(
+        ("leaderboard", order_by, limit, cursor),
+        lambda: call_upstream("leaderboard", "GET", "/leaderboard", params=params)
+    )
+
+    if status != 200:
+        raise HTTPException(status_code=status, detail=data['detail'])
+
+    return data
+
+@app.get("/leaderboard/top/{k}")
+async def get_leaderboard_top(request: Request, k: int):
+    """
+    Return the k users with the most wins
+    """
+    jwt_token = request.headers.get("Authorization")
+    if not jwt_token:
+        raise HTTPException(status_code=401, detail="Authorization token missing")
+
+    jwt_token = jwt_token.replace("Bearer ", "")
+
+    try:
+        jwt.decode(jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=[os.getenv("JWT_ALGORITHM")])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token has expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    status, data = await leaderboard_cache.get(("top", k), lambda: call_upstream("leaderboard", "GET", f"/leaderboard/top/{k}"))
+
+    if status != 200:
+        raise HTTPException(status_code=status, detail=data['detail'])
+
+    return data
+
+@app.get("/rank")
+async def get_rank(request: Request, radius: int = 0):
+    """
+    Return the rank of the logged user, with the users ranked `radius` places around them when radius is positive
+    """
+    jwt_token = request.headers.get("Authorization")
+    if not jwt_token:
+        raise HTTPException(status_code=401, detail="Authorization token missing")
+
+    jwt_token = jwt_token.replace("Bearer ", "")
+
+    try:
+        decoded = jwt.decode(jwt_token, os.getenv("JWT_SECRET_KEY"), algorithms=[os.getenv("JWT_ALGORITHM")])
+        user_id = decoded['sub']
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token has expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    status, data = await call_upstream("leaderboard", "GET", f"/rank/{user_id}")
+
+    if status != 200:
+        raise HTTPException(status_code=status, detail=data['detail'])
+
+    if radius > 0:
+        status, neighbors = await call_upstream("leaderboard", "GET", f"/rank/{user_id}/neighbors", params={"radius": radius})
+
+        if status != 200:
+            raise HTTPException(status_code=status, detail=neighbors['detail'])
 
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail=response.json()['detail'])
+        data["neighbors"] = neighbors
 
-    return response.json()
\ No newline at end of file
+    return data
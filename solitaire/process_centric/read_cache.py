@@ -0,0 +1,72 @@
+import asyncio
+import functools
+import time
+
+class ReadCache:
+    """
+    Short-TTL cache of upstream reads with request coalescing
+
+    Concurrent misses on a key share one upstream call. A fresh entry is served
+    as is; within `stale_ttl` after expiry it is still served while a single
+    background call refreshes it, so readers never wait on a refresh. Only
+    successful responses are cached.
+    """
+    def __init__(self, ttl=2.0, stale_ttl=30.0, max_entries=1024, clock=time.monotonic):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = {}
+        self.inflight = {}
+
+    async def get(self, key, fetch):
+        """
+        Return the (status, data) response for key, calling `fetch()` at most once at a time
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            age = self.clock() - entry[0]
+            if age < self.ttl:
+                return entry[1]
+            if age < self.ttl + self.stale_ttl:
+                self.refresh(key, fetch, background=True)
+                return entry[1]
+
+        # Shielded, a caller giving up must not cancel the call the other waiters share
+        return await asyncio.shield(self.refresh(key, fetch))
+
+    def refresh(self, key, fetch, background=False):
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.load(key, fetch))
+            task.add_done_callback(functools.partial(self.report, background))
+            self.inflight[key] = task
+        return task
+
+    async def load(self, key, fetch):
+        try:
+            response = await fetch()
+            if response[0] == 200:
+                self.entries.pop(key, None)
+                self.entries[key] = (self.clock(), response)
+                while len(self.entries) > self.max_entries:
+                    del self.entries[next(iter(self.entries))]
+            return response
+        finally:
+            del self.inflight[key]
+
+    def report(self, background, task):
+        # Always retrieved so asyncio does not warn when every waiter gave up,
+        # only background refreshes are logged since nobody else sees their failure
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None and background:
+            detail = getattr(error, "detail", None) or repr(error)
+            print(f"Background refresh of cached read failed: {detail}")
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
@@ -0,0 +1,90 @@
+"""
+Compare move latency of the embedded and remote rules modes.
+
+The same legal move is applied repeatedly to the same position, once in-process
+through embedded_rules.apply_move and once through solitaire_logic's /move_card
+over a pooled keep-alive connection, exactly as main.py does in each mode.
+
+Example:
+    python rules_benchmark.py --logic-url http://localhost:8005 --iterations 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from embedded_rules import apply_move
+from solitaire import SolitaireGame
+from upstream import Upstream
+
+VALUES = ['ACE', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'JACK', 'QUEEN', 'KING']
+SUITS = ['HEARTS', 'DIAMONDS', 'CLUBS', 'SPADES']
+
+
+def find_position(seed=0):
+    """
+    Deal games until one has a legal tableau move, returns the game and the move
+    """
+    while True:
+        deck = [
+            {"code": ("0" if value == '10' else value[0]) + suit[0], "value": value, "suit": suit}
+            for suit in SUITS for value in VALUES
+        ]
+        random.Random(seed).shuffle(deck)
+
+        tableau = []
+        for i in range(7):
+            column = [(deck.pop(), False) for _ in range(i + 1)]
+            column[-1] = (column[-1][0], True)
+            tableau.append(column)
+        game = SolitaireGame(deck_id="benchmark", tableau=tableau, stock=deck, auto_setup=False)
+
+        for column_from in range(7):
+            for column_to in range(7):
+                move = {"column_from": column_from, "column_to": column_to, "number_of_cards": 1}
+                if apply_move(game.to_dict(), move)[0] == 200:
+                    return game, move
+        seed += 1
+
+
+def report(name, latencies):
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e6
+
+    print(f"{name:<9} p50 {percentile(0.50):9.1f} us   p99 {percentile(0.99):9.1f} us")
+
+
+async def run(logic_url, iterations):
+    game, move = find_position()
+
+    embedded = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        apply_move(game.to_dict(), move)
+        embedded.append(time.perf_counter() - start)
+
+    upstream = Upstream("logic", logic_url, 1)
+    await upstream.start()
+    remote = []
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await upstream.request("POST", "/move_card", json={"game": game.to_dict(), **move})
+            remote.append(time.perf_counter() - start)
+    finally:
+        await upstream.close()
+
+    print(f"move {move}, {iterations} iterations")
+    report("embedded", embedded)
+    report("remote", remote)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedded vs remote solitaire rules")
+    parser.add_argument("--logic-url", default="http://localhost:8005")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.logic_url, args.iterations))
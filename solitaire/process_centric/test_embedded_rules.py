@@ -0,0 +1,129 @@
+import importlib.util
+import json
+import os
+import random
+import pytest
+from fastapi.testclient import TestClient
+from embedded_rules import apply_move
+from solitaire import SolitaireGame
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOGIC_DIR = os.path.join(HERE, "..", "solitaire_logic")
+
+VALUES = ['ACE', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'JACK', 'QUEEN', 'KING']
+SUITS = ['HEARTS', 'DIAMONDS', 'CLUBS', 'SPADES']
+
+def load_logic_app():
+    """
+    Load solitaire_logic's FastAPI app, which serves as the remote authority
+    """
+    spec = importlib.util.spec_from_file_location("solitaire_logic_main", os.path.join(LOGIC_DIR, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+@pytest.fixture(scope="module")
+def logic_client():
+    return TestClient(load_logic_app())
+
+def deal(seed):
+    """
+    Deal a Klondike layout the same way SolitaireGame.setup_game does
+    """
+    deck = [
+        {"code": ("0" if value == '10' else value[0]) + suit[0], "value": value, "suit": suit}
+        for suit in SUITS for value in VALUES
+    ]
+    random.Random(seed).shuffle(deck)
+
+    tableau = []
+    for i in range(7):
+        column = [(deck.pop(), False) for _ in range(i + 1)]
+        column[-1] = (column[-1][0], True)
+        tableau.append(column)
+
+    return SolitaireGame(deck_id="conformance", tableau=tableau, stock=deck, auto_setup=False)
+
+def candidate_moves(game):
+    moves = []
+    for column_from in range(7):
+        for column_to in range(7):
+            # Every face up run plus one card too many
+            face_up = sum(1 for _, visible in game.tableau[column_from] if visible)
+            for n in range(1, face_up + 2):
+                moves.append({"column_from": column_from, "column_to": column_to, "number_of_cards": n})
+        for suit in SUITS:
+            moves.append({"column_from": column_from, "suit": suit})
+    for column_to in range(7):
+        moves.append({"column_to": column_to})
+    for suit in SUITS:
+        moves.append({"suit": suit})
+    return moves
+
+def remote_move(logic_client, game, move):
+    response = logic_client.post("/move_card", json={"game": game.to_dict(), **move})
+    return response.status_code, response.json()
+
+def embedded_move(game, move):
+    status, data = apply_move(game.to_dict(), move)
+    # Normalize the way the HTTP hop does, e.g. tableau tuples become lists
+    return status, json.loads(json.dumps(data))
+
+def test_engine_copies_are_identical():
+    with open(os.path.join(HERE, "solitaire.py")) as embedded, open(os.path.join(LOGIC_DIR, "solitaire.py")) as remote:
+        assert embedded.read() == remote.read()
+
+@pytest.mark.parametrize("seed", range(8))
+def test_random_play_matches_remote(logic_client, seed):
+    rng = random.Random(seed)
+    game = deal(seed)
+
+    for _ in range(120):
+        if rng.random() < 0.2:
+            if game.stock:
+                game.draw_from_stock()
+            elif game.talon:
+                game.reload_stock_from_talon()
+            continue
+
+        moves = candidate_moves(game)
+        # Try the legal moves often enough to keep the game moving forward
+        legal = [move for move in moves if apply_move(game.to_dict(), move)[0] == 200]
+        move = rng.choice(legal if legal and rng.random() < 0.7 else moves)
+
+        remote = remote_move(logic_client, game, move)
+        embedded = embedded_move(game, move)
+
+        assert embedded == remote
+        if remote[0] == 200:
+            game = SolitaireGame.from_dict(remote[1]["game"])
+
+def test_winning_move_matches_remote(logic_client):
+    foundation = {
+        suit: [{"code": ("0" if value == '10' else value[0]) + suit[0], "value": value, "suit": suit} for value in VALUES]
+        for suit in SUITS
+    }
+    king = foundation["SPADES"].pop()
+    game = SolitaireGame(
+        deck_id="conformance",
+        tableau=[[] for _ in range(7)],
+        foundation=foundation,
+        talon=[king],
+        auto_setup=False
+    )
+
+    remote = remote_move(logic_client, game, {"suit": "SPADES"})
+    embedded = embedded_move(game, {"suit": "SPADES"})
+
+    assert remote[1]["game_status"] == "won"
+    assert embedded == remote
+
+def test_rejected_move_leaves_game_untouched():
+    game = deal(0)
+    before = game.to_dict()
+
+    status, data = apply_move(game.to_dict(), {"column_to": 0})
+
+    assert status == 409
+    assert data == {"detail": "No cards available in the talon to be moved into tableau"}
+    assert game.to_dict() == before
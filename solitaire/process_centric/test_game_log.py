@@ -0,0 +1,106 @@
+import asyncio
+import os
+from solitaire import SolitaireGame
+from game_log import GameJournal, GameLog, read_log
+from game_store import GameStore
+
+def make_game(n):
+    return SolitaireGame(
+        deck_id=f"deck-{n}",
+        tableau=[[{"value": "ACE", "suit": "HEARTS", "faceUp": True}]],
+        stock=[{"value": str(n), "suit": "SPADES", "faceUp": False}],
+        auto_setup=False
+    )
+
+def test_read_log_truncates_torn_tail(tmp_path):
+    path = str(tmp_path / "games.log")
+    log = GameLog(path)
+    log.append({"n": 1})
+    log.append({"n": 2})
+    log.close()
+    size = os.path.getsize(path)
+
+    # A crash in the middle of a write leaves half a record behind
+    with open(path, "ab") as f:
+        f.write(b"\x20\x00\x00\x00garbage")
+
+    assert read_log(path) == [{"n": 1}, {"n": 2}]
+    assert os.path.getsize(path) == size
+
+def test_games_survive_restart_without_snapshot(tmp_path):
+    store = GameStore(journal=GameJournal(str(tmp_path)))
+    store.put("a", make_game(1))
+    store.put("a", make_game(2))
+    store.put("b", make_game(3))
+    # No clean shutdown, only what reached the log is left
+
+    restarted = GameStore(journal=GameJournal(str(tmp_path)))
+
+    assert len(restarted) == 2
+    assert restarted.version("a") == 2
+    assert restarted.get("a").to_dict() == make_game(2).to_dict()
+    assert restarted.get("b").to_dict() == make_game(3).to_dict()
+    assert restarted.put("a", make_game(4)) == 3
+
+def test_restart_maps_snapshot_and_replays_tail(tmp_path):
+    store = GameStore(journal=GameJournal(str(tmp_path)))
+    for n in range(100):
+        store.put(f"game-{n}", make_game(n))
+    asyncio.run(store.checkpoint())
+    store.put("game-0", make_game(1000))
+    store.put("game-new", make_game(2000))
+
+    restarted = GameStore(journal=GameJournal(str(tmp_path)))
+
+    assert len(restarted) == 101
+    # Only the tail is decoded up front, snapshot games wait for their first access
+    assert set(restarted.recovered) == {"game-0", "game-new"}
+    assert restarted.get("game-0").to_dict() == make_game(1000).to_dict()
+    assert restarted.version("game-0") == 2
+    assert restarted.get("game-42").to_dict() == make_game(42).to_dict()
+    assert restarted.get("missing") is None
+
+def test_checkpoint_retires_covered_files(tmp_path):
+    journal = GameJournal(str(tmp_path))
+    store = GameStore(journal=journal)
+    store.put("a", make_game(1))
+    asyncio.run(store.checkpoint())
+    store.put("b", make_game(2))
+    asyncio.run(store.checkpoint())
+
+    assert journal.files("snap") == [journal.sequence]
+    assert journal.files("log") == [journal.sequence]
+
+    # Games copied from the previous snapshot without being decoded are still intact
+    restarted = GameStore(journal=GameJournal(str(tmp_path)))
+    assert restarted.get("a").to_dict() == make_game(1).to_dict()
+    assert restarted.get("b").to_dict() == make_game(2).to_dict()
+
+def test_incomplete_snapshot_falls_back_to_previous_one(tmp_path):
+    journal = GameJournal(str(tmp_path))
+    store = GameStore(journal=journal)
+    store.put("a", make_game(1))
+    asyncio.run(store.checkpoint())
+    store.put("a", make_game(2))
+
+    with open(journal.path(journal.sequence + 1, "snap"), "wb") as f:
+        f.write(b"not a snapshot")
+
+    restarted = GameStore(journal=GameJournal(str(tmp_path)))
+    assert restarted.get("a").to_dict() == make_game(2).to_dict()
+
+def test_stop_writes_final_snapshot(tmp_path):
+    journal = GameJournal(str(tmp_path))
+    store = GameStore(journal=journal, snapshot_interval=0.01)
+
+    async def main():
+        store.start()
+        store.put("a", make_game(1))
+        await asyncio.sleep(0.05)
+        await store.stop()
+
+    asyncio.run(main())
+
+    restarted = GameStore(journal=GameJournal(str(tmp_path)))
+    assert restarted.recovered == {}
+    assert restarted.get("a").to_dict() == make_game(1).to_dict()
@@ -0,0 +1,60 @@
+import asyncio
+from game_store import GameStore
+
+def test_put_increments_version():
+    store = GameStore()
+
+    assert store.version("game") == 0
+    assert store.put("game", "state 1") == 1
+    assert store.put("game", "state 2") == 2
+    assert store.get("game") == "state 2"
+    assert store.get("missing") is None
+
+def test_lock_serializes_read_modify_write_on_same_game():
+    store = GameStore()
+    store.put("game", 0)
+
+    async def move():
+        async with store.lock("game"):
+            value = store.get("game")
+            # Stands in for the round trip to solitaire_logic
+            await asyncio.sleep(0.01)
+            store.put("game", value + 1)
+
+    async def main():
+        await asyncio.gather(*(move() for _ in range(20)))
+
+    asyncio.run(main())
+
+    assert store.get("game") == 20
+    assert store.version("game") == 21
+
+def test_games_on_different_stripes_do_not_wait_for_each_other():
+    store = GameStore(lock_stripes=64)
+    game_ids = []
+    stripes = set()
+    for i in range(1000):
+        stripe = id(store.lock(f"game-{i}"))
+        if stripe not in stripes:
+            stripes.add(stripe)
+            game_ids.append(f"game-{i}")
+        if len(game_ids) == 10:
+            break
+
+    async def move(game_id):
+        async with store.lock(game_id):
+            await asyncio.sleep(0.1)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*(move(game_id) for game_id in game_ids))
+        return loop.time() - start
+
+    assert asyncio.run(main()) < 0.5
+
+def test_lock_stripes_are_bounded():
+    store = GameStore(lock_stripes=16)
+    locks = {id(store.lock(f"game-{i}")) for i in range(10000)}
+
+    assert len(locks) <= 16
@@ -0,0 +1,143 @@
+import asyncio
+import sqlite3
+import time
+from leaderboard_outbox import LeaderboardOutbox
+from upstream import UpstreamError
+
+class FakeLeaderboard:
+    def __init__(self, responses=None):
+        self.calls = []
+        self.responses = responses or []
+
+    async def request(self, method, path, **kwargs):
+        self.calls.append((method, path))
+        if self.responses:
+            response = self.responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        return 200, {}
+
+def test_drain_delivers_and_removes_entries(tmp_path):
+    upstream = FakeLeaderboard()
+    outbox = LeaderboardOutbox(str(tmp_path / "outbox.db"), upstream)
+    outbox.enqueue("new_game", "user1")
+    outbox.enqueue("won_game", "user1")
+    outbox.enqueue("new_game", "user2")
+
+    delivered = asyncio.run(outbox.drain_once())
+
+    assert delivered == 3
+    assert outbox.pending() == 0
+    assert ("POST", "/new_game/user2") in upstream.calls
+    user1_calls = [call for call in upstream.calls if call[1].endswith("user1")]
+    assert user1_calls == [("POST", "/new_game/user1"), ("POST", "/won_game/user1")]
+
+def test_drain_keeps_entries_when_leaderboard_is_down(tmp_path):
+    upstream = FakeLeaderboard([UpstreamError("down")])
+    outbox = LeaderboardOutbox(str(tmp_path / "outbox.db"), upstream)
+    outbox.enqueue("new_game", "user1")
+    outbox.enqueue("won_game", "user1")
+
+    asyncio.run(outbox.drain_once())
+
+    # The failed update and the one queued behind it wait for their backoff
+    assert upstream.calls == [("POST", "/new_game/user1")]
+    assert outbox.pending() == 2
+    assert asyncio.run(outbox.drain_once()) == 0
+
+def test_updates_queued_behind_a_failed_one_wait_for_it(tmp_path):
+    upstream = FakeLeaderboard([UpstreamError("down")])
+    outbox = LeaderboardOutbox(str(tmp_path / "outbox.db"), upstream, retry_base=0.05)
+    outbox.enqueue("new_game", "user1")
+    asyncio.run(outbox.drain_once())
+    outbox.enqueue("won_game", "user1")
+    outbox.enqueue("new_game", "user2")
+
+    # Only the other user's update is due while user1's first update backs off
+    assert asyncio.run(outbox.drain_once()) == 1
+    time.sleep(0.1)
+    asyncio.run(outbox.drain_once())
+
+    assert [path for _, path in upstream.calls] == ["/new_game/user1", "/new_game/user2", "/new_game/user1", "/won_game/user1"]
+    assert outbox.pending() == 0
+
+def test_updates_are_dropped_after_max_attempts(tmp_path):
+    upstream = FakeLeaderboard([(404, {"detail": "not found"}), (404, {"detail": "not found"})])
+    outbox = LeaderboardOutbox(str(tmp_path / "outbox.db"), upstream, retry_base=0, max_attempts=2)
+    outbox.enqueue("won_game", "user1")
+    outbox.enqueue("new_game", "user1")
+
+    asyncio.run(outbox.drain_once())
+    asyncio.run(outbox.drain_once())
+
+    # The update given up on no longer blocks the one queued behind it
+    assert [path for _, path in upstream.calls] == ["/won_game/user1", "/won_game/user1", "/new_game/user1"]
+    assert outbox.pending() == 0
+
+def test_update_queued_behind_a_failing_one_keeps_its_attempts(tmp_path):
+    upstream = FakeLeaderboard([(503, {})] * 3 + [(503, {})] * 3)
+    outbox = LeaderboardOutbox(str(tmp_path / "outbox.db"), upstream, retry_base=0, max_attempts=3)
+    outbox.enqueue("won_game", "user1")
+    outbox.enqueue("new_game", "user1")
+
+    for _ in range(6):
+        asyncio.run(outbox.drain_once())
+
+    # Each update is tried max_attempts times, waiting does not count as an attempt
+    assert [path for _, path in upstream.calls] == ["/won_game/user1"] * 3 + ["/new_game/user1"] * 3
+    assert outbox.pending() == 0
+
+def test_entries_survive_restart(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    outbox = LeaderboardOutbox(path, FakeLeaderboard())
+    outbox.enqueue("new_game", "user1")
+    outbox.db.close()
+
+    upstream = FakeLeaderboard()
+    restarted = LeaderboardOutbox(path, upstream)
+    asyncio.run(restarted.drain_once())
+
+    assert upstream.calls == [("POST", "/new_game/user1")]
+    assert restarted.pending() == 0
+
+def test_drain_drops_rejected_entries(tmp_path):
+    upstream = FakeLeaderboard([(422, {"detail": "bad request"})])
+    outbox = LeaderboardOutbox(str(tmp_path / "outbox.db"), upstream)
+    outbox.enqueue("new_game", "user1")
+
+    asyncio.run(outbox.drain_once())
+
+    assert outbox.pending() == 0
+
+class RecordingLeaderboard(FakeLeaderboard):
+    async def request(self, method, path, **kwargs):
+        self.calls.append((method, path, kwargs))
+        return 200, {}
+
+def test_game_details_are_sent_as_query_parameters(tmp_path):
+    upstream = RecordingLeaderboard()
+    outbox = LeaderboardOutbox(str(tmp_path / "outbox.db"), upstream)
+    outbox.enqueue("won_game", "user1", {"game_id": "game1", "moves": 42})
+    outbox.enqueue("new_game", "user1")
+
+    asyncio.run(outbox.drain_once())
+
+    assert upstream.calls == [
+        ("POST", "/won_game/user1", {"params": {"game_id": "game1", "moves": 42}}),
+        ("POST", "/new_game/user1", {}),
+    ]
+
+def test_outbox_without_params_column_is_migrated(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, action TEXT NOT NULL, user_id TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL DEFAULT 0)")
+    db.execute("INSERT INTO outbox (action, user_id) VALUES ('new_game', 'user1')")
+    db.commit()
+    db.close()
+
+    upstream = RecordingLeaderboard()
+    outbox = LeaderboardOutbox(path, upstream)
+    asyncio.run(outbox.drain_once())
+
+    assert upstream.calls == [("POST", "/new_game/user1", {})]
@@ -0,0 +1,107 @@
+import asyncio
+from fastapi import HTTPException
+from read_cache import ReadCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeLeaderboard:
+    def __init__(self, status=200):
+        self.calls = 0
+        self.status = status
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.status, {"call": self.calls}
+
+def test_concurrent_misses_share_one_call():
+    cache = ReadCache()
+    upstream = FakeLeaderboard()
+
+    async def main():
+        return await asyncio.gather(*(cache.get("leaderboard", upstream.fetch) for _ in range(1000)))
+
+    responses = asyncio.run(main())
+
+    assert upstream.calls == 1
+    assert all(response == (200, {"call": 1}) for response in responses)
+
+def test_fresh_entry_is_served_from_cache():
+    clock = FakeClock()
+    cache = ReadCache(ttl=2, stale_ttl=30, clock=clock)
+    upstream = FakeLeaderboard()
+
+    async def main():
+        await cache.get("leaderboard", upstream.fetch)
+        clock.now = 1
+        return await cache.get("leaderboard", upstream.fetch)
+
+    assert asyncio.run(main()) == (200, {"call": 1})
+    assert upstream.calls == 1
+
+def test_stale_entry_is_served_while_refreshing_once():
+    clock = FakeClock()
+    cache = ReadCache(ttl=2, stale_ttl=30, clock=clock)
+    upstream = FakeLeaderboard()
+
+    async def main():
+        await cache.get("leaderboard", upstream.fetch)
+        clock.now = 5
+        stale = await asyncio.gather(*(cache.get("leaderboard", upstream.fetch) for _ in range(100)))
+        await asyncio.sleep(0.05)
+        return stale, await cache.get("leaderboard", upstream.fetch)
+
+    stale, refreshed = asyncio.run(main())
+
+    assert all(response == (200, {"call": 1}) for response in stale)
+    assert refreshed == (200, {"call": 2})
+    assert upstream.calls == 2
+
+def test_expired_entry_waits_for_a_new_call():
+    clock = FakeClock()
+    cache = ReadCache(ttl=2, stale_ttl=30, clock=clock)
+    upstream = FakeLeaderboard()
+
+    async def main():
+        await cache.get("leaderboard", upstream.fetch)
+        clock.now = 40
+        return await cache.get("leaderboard", upstream.fetch)
+
+    assert asyncio.run(main()) == (200, {"call": 2})
+
+def test_errors_are_not_cached():
+    cache = ReadCache()
+    upstream = FakeLeaderboard(status=503)
+
+    async def main():
+        await cache.get("leaderboard", upstream.fetch)
+        return await cache.get("leaderboard", upstream.fetch)
+
+    assert asyncio.run(main()) == (503, {"call": 2})
+
+def test_only_background_refresh_failures_are_logged(capsys):
+    clock = FakeClock()
+    cache = ReadCache(ttl=2, stale_ttl=30, clock=clock)
+    upstream = FakeLeaderboard()
+
+    async def failing():
+        raise HTTPException(status_code=503, detail="leaderboard unavailable")
+
+    async def main():
+        try:
+            await cache.get("other", failing)
+        except HTTPException:
+            pass
+        await cache.get("leaderboard", upstream.fetch)
+        clock.now = 5
+        await cache.get("leaderboard", failing)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+
+    assert capsys.readouterr().out.splitlines() == ["Background refresh of cached read failed: leaderboard unavailable"]
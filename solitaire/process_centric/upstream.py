@@ -0,0 +1,53 @@
+import aiohttp
+import asyncio
+import os
+
+# Outbound HTTP tuning, shared by every upstream client
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "2"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+class UpstreamError(Exception):
+    """
+    Raised when an upstream service cannot be reached or does not answer in time
+    """
+    pass
+
+class Upstream:
+    """
+    Keep-alive, connection-pooled async client for one upstream service
+    """
+    def __init__(self, name, base_url, max_connections):
+        self.name = name
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.session = None
+
+    async def start(self):
+        """
+        Open the connection pool, must run inside the event loop
+        """
+        self.session = aiohttp.ClientSession(
+            base_url=self.base_url,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT, sock_connect=HTTP_CONNECT_TIMEOUT),
+            connector=aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def request(self, method, path, **kwargs):
+        """
+        Send a request and return the status code together with the decoded JSON body
+        """
+        try:
+            async with self.session.request(method, path, **kwargs) as response:
+                data = await response.json(content_type=None)
+                return response.status, data
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise UpstreamError(f"Error communicating with {self.name} service: {str(e) or type(e).__name__}")
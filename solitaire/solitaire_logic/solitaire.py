@@ -19,6 +19,16 @@ value_mapping = {
     'KING':     13,
 }
 
+def slim_card(card):
+    """
+    Keep only the fields the game needs, clients derive the image URLs from the code
+    """
+    return {
+        "code": card['code'],
+        "value": card['value'],
+        "suit": card['suit']
+    }
+
 class SolitaireGame:
     deck_id = None # deck id from deck adapter
     tableau = None # columns of cards
@@ -79,21 +89,26 @@ class SolitaireGame:
         else:
             return response.json()
 
+    def get_layout_from_adapter(self):
+        """
+        Deals the whole Klondike layout of the deck in one call
+        """
+        response = self._get(f"{URL}/deal/klondike/{self.deck_id}")
+
+        if response.status_code != 200:
+            raise Exception("Failed to deal the layout from the deck")
+        else:
+            return response.json()
+
     def setup_game(self):
-        # draw cards for tableau
+        data = self.get_layout_from_adapter()
+
+        # only the last card of each tableau column is face up
         self.tableau = []
-        for i in range(7):
-            data = self.get_cards_from_adapter(i + 1)
-            cards = [(card, False) for card in data['cards']] # False because initially cards are face down
-            self.tableau.append([])
-            for j in range(len(cards)):
-                self.tableau[len(self.tableau) - 1].append(cards[j])
-                if j == len(cards) - 1:
-                    self.tableau[len(self.tableau) - 1][j] = (self.tableau[len(self.tableau) - 1][j][0], True)
-
-        # draw cards for stock
-        data = self.get_cards_from_adapter(24)
-        self.stock = data['cards']
+        for column in data['tableau']:
+            self.tableau.append([(slim_card(card), j == len(column) - 1) for j, card in enumerate(column)])
+
+        self.stock = [slim_card(card) for card in data['stock']]
 
         # initialize foundation and talon
         self.foundation = {'HEARTS': [], 'DIAMONDS': [], 'CLUBS': [], 'SPADES': []}
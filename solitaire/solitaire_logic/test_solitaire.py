@@ -28,8 +28,14 @@ def test_game_init(mocker):
 
     draws = draws_helper()
 
-    mock_draw_cards = mocker.patch('solitaire.SolitaireGame.get_cards_from_adapter')
-    mock_draw_cards.side_effect = draws
+    mock_deal_layout = mocker.patch('solitaire.SolitaireGame.get_layout_from_adapter')
+    mock_deal_layout.return_value = {
+        "success": True,
+        "deck_id": "kgw5s4v0d5b5",
+        "tableau": [draw['cards'] for draw in draws[:7]],
+        "stock": draws[7]['cards'],
+        "remaining": 0
+    }
 
     # Test game init
     new_game = SolitaireGame()
@@ -42,6 +48,7 @@ def test_game_init(mocker):
     assert len(new_game.tableau[4]) == 5
     assert len(new_game.tableau[5]) == 6
     assert len(new_game.tableau[6]) == 7
+    assert all(face_up == (j == len(column) - 1) for column in new_game.tableau for j, (_, face_up) in enumerate(column))
     assert len(new_game.stock) == 24
     assert len(new_game.foundation['HEARTS']) == 0
     assert len(new_game.foundation['CLUBS']) == 0
@@ -49,6 +56,35 @@ def test_game_init(mocker):
     assert len(new_game.foundation['DIAMONDS']) == 0
     assert len(new_game.talon) == 0
 
+def test_game_init_keeps_slim_cards(mocker):
+    mock_get_new_deck = mocker.patch('solitaire.SolitaireGame.get_deck_from_adapter')
+    mock_get_new_deck.return_value = new_deck_helper()
+
+    def full_card(card):
+        return {
+            **card,
+            "image": f"https://deckofcardsapi.com/static/img/{card['code']}.png",
+            "images": {
+                "svg": f"https://deckofcardsapi.com/static/img/{card['code']}.svg",
+                "png": f"https://deckofcardsapi.com/static/img/{card['code']}.png"
+            }
+        }
+
+    draws = draws_helper()
+    mock_deal_layout = mocker.patch('solitaire.SolitaireGame.get_layout_from_adapter')
+    mock_deal_layout.return_value = {
+        "success": True,
+        "deck_id": "kgw5s4v0d5b5",
+        "tableau": [[full_card(card) for card in draw['cards']] for draw in draws[:7]],
+        "stock": [full_card(card) for card in draws[7]['cards']],
+        "remaining": 0
+    }
+
+    new_game = SolitaireGame()
+
+    assert new_game.tableau[1] == [({"code": "6S", "value": "6", "suit": "SPADES"}, False), ({"code": "2C", "value": "2", "suit": "CLUBS"}, True)]
+    assert new_game.stock == draws[7]['cards']
+
 def test_move_card_inside_tableau_accept_red_over_black():
     # Setup the game state
     tableau = [
@@ -51,6 +51,16 @@ const storeGameState = (gameId: string, state: any) => {
 }
 
 
+// Game state only carries card codes, assets are served under a fixed template
+const CARD_IMAGE_URL = 'https://deckofcardsapi.com/static/img'
+
+const cardImageUrl = (card: { code?: string; image?: string }): string | undefined => {
+  if (card.image) return card.image
+  if (!card.code) return undefined
+  // The Deck of Cards API serves the ace of diamonds png under its own name
+  return card.code === 'AD' ? `${CARD_IMAGE_URL}/aceDiamonds.png` : `${CARD_IMAGE_URL}/${card.code}.png`
+}
+
 const preloadCardImages = async (gameState: any): Promise<void> => {
   const imageUrls = new Set<string>()
 
@@ -60,13 +70,16 @@ const preloadCardImages = async (gameState: any): Promise<void> => {
       if (typeof card === 'object' && card !== null) {
         // Handle card tuples [card, faceUp]
         if (Array.isArray(card)) {
-          const cardObj = card[0]
-          if (cardObj?.image) {
-            imageUrls.add(cardObj.image)
+          const url = card[0] && cardImageUrl(card[0])
+          if (url) {
+            imageUrls.add(url)
           }
-        } else if (card.image) {
+        } else {
           // Handle plain card objects
-          imageUrls.add(card.image)
+          const url = cardImageUrl(card)
+          if (url) {
+            imageUrls.add(url)
+          }
         }
       }
     })
@@ -141,7 +154,7 @@ function Confetti({ active }: { active: boolean }) {
 
 
 interface CardProps {
-  card: { value: string; suit: string; image?: string }
+  card: { code?: string; value: string; suit: string; image?: string }
   faceUp: boolean
   selected: boolean
   onClick: () => void
@@ -168,9 +181,9 @@ function Card({ card, faceUp, selected, onClick }: CardProps) {
         : 'border-slate-300 hover:scale-105 hover:shadow-lg'
         } bg-white relative`}
     >
-      {card.image ? (
+      {cardImageUrl(card) ? (
         <img
-          src={card.image}
+          src={cardImageUrl(card)}
           alt={`${card.value} of ${card.suit}`}
           className="w-full h-full object-cover"
         />
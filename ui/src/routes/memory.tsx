@@ -6,21 +6,14 @@ import { authService } from '../services/auth'
 
 const MEMORY_SERVICE_URL = 'http://localhost:8003'
 
-interface Card {
-  id: number
-  localId: number
-  flipped: boolean
-  image: string
-  kindId: number
-  ownedBy: boolean | null
-}
-
 interface Game {
   gameId: number
   size: number
   winner: string | null
-  player1Cards: Card[]
-  player2Cards: Card[]
+  player1Count: number
+  player2Count: number
+  player1KindIds: number[]
+  player2KindIds: number[]
 }
 
 
@@ -38,6 +31,7 @@ function getSizeLabel(size: number | null | undefined): string {
 
 interface UserGamesResponse {
   games: Game[]
+  nextCursor: number | null
 }
 
 interface GameSize {
@@ -75,6 +69,8 @@ function Memory() {
   const navigate = useNavigate()
   const [showSizePopup, setShowSizePopup] = useState(false)
   const [userGames, setUserGames] = useState<Game[]>([])
+  const [nextCursor, setNextCursor] = useState<number | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loadingGames, setLoadingGames] = useState(true)
   const [isCreatingGame, setIsCreatingGame] = useState(false)
   const [gameToDelete, setGameToDelete] = useState<number | null>(null)
@@ -99,6 +95,7 @@ function Memory() {
         if (!response.ok) throw new Error('Failed to fetch games')
         const data: UserGamesResponse = await response.json()
         setUserGames(data.games)
+        setNextCursor(data.nextCursor)
       } catch (err) {
         console.error('Failed to fetch user games:', err)
       } finally {
@@ -152,6 +149,34 @@ function Memory() {
     }
   }
 
+  const handleLoadMore = async () => {
+    if (nextCursor === null) return
+
+    setLoadingMore(true)
+    try {
+      const token = authService.getAccessToken()
+      const headers: HeadersInit = {
+        'Content-Type': 'application/json',
+      }
+
+      if (token) {
+        headers['Authorization'] = `Bearer ${token}`
+      }
+
+      const response = await fetch(`${MEMORY_SERVICE_URL}/user_games/${user?.id || 1}?cursor=${nextCursor}`, {
+        headers,
+      })
+      if (!response.ok) throw new Error('Failed to fetch games')
+      const data: UserGamesResponse = await response.json()
+      setUserGames((games) => [...games, ...data.games])
+      setNextCursor(data.nextCursor)
+    } catch (err) {
+      console.error('Failed to fetch more games:', err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleDeleteClick = (e: React.MouseEvent, gameId: number) => {
     e.stopPropagation()
     setGameToDelete(gameId)
@@ -184,6 +209,7 @@ function Memory() {
       if (!gamesResponse.ok) throw new Error('Failed to fetch games')
       const data: UserGamesResponse = await gamesResponse.json()
       setUserGames(data.games)
+      setNextCursor(data.nextCursor)
     } catch (err) {
       console.error('Failed to delete game:', err)
     } finally {
@@ -329,11 +355,11 @@ function Memory() {
                             <div className="flex items-center gap-4 text-sm">
                               <div className="flex items-center gap-1.5 text-slate-600">
                                 <User size={14} />
-                                <span>P1: {game.player1Cards.length}</span>
+                                <span>P1: {game.player1Count}</span>
                               </div>
                               <div className="flex items-center gap-1.5 text-slate-600">
                                 <User size={14} />
-                                <span>P2: {game.player2Cards.length}</span>
+                                <span>P2: {game.player2Count}</span>
                               </div>
                             </div>
                           </div>
@@ -342,6 +368,15 @@ function Memory() {
                       </div>
                     </div>
                   ))}
+                  {nextCursor !== null && (
+                    <button
+                      onClick={handleLoadMore}
+                      disabled={loadingMore}
+                      className="w-full text-slate-600 hover:text-blue-600 font-medium py-2 px-4 rounded-lg hover:bg-blue-50 transition-colors disabled:opacity-50"
+                    >
+                      {loadingMore ? 'Loading...' : 'Load more games'}
+                    </button>
+                  )}
                 </div>
               )}
             </div>
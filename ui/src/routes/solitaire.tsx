@@ -13,6 +13,7 @@ if (!(window as any).__solitaireGameStates) {
 
 interface LeaderboardEntry {
   user_id: string
+  username?: string | null
   played_games: number
   games_won: number
 }
@@ -59,7 +60,7 @@ function Solitaire() {
         headers['Authorization'] = `Bearer ${token}`
       }
 
-      const response = await fetch(`${SOLITAIRE_SERVICE_URL}/leaderboard`, {
+      const response = await fetch(`${SOLITAIRE_SERVICE_URL}/leaderboard/top/10`, {
         headers
       })
 
@@ -147,8 +148,6 @@ function Solitaire() {
                   </thead>
                   <tbody className="divide-y divide-slate-100">
                     {leaderboard
-                      .sort((a, b) => b.games_won - a.games_won)
-                      .slice(0, 10)
                       .map((entry) => {
                         const winRate = entry.played_games > 0
                           ? Math.round((entry.games_won / entry.played_games) * 100)
@@ -157,8 +156,10 @@ function Solitaire() {
 
                         return (
                           <tr key={entry.user_id} className={`hover:bg-slate-50 transition-colors ${isCurrentUser ? 'bg-blue-50/50' : ''}`}>
-                            <td className="px-2 py-3 font-medium text-slate-900 truncate max-w-[120px]" title={entry.user_id}>
-                              {isCurrentUser ? `${entry.user_id.substring(0, 8)}... (You)` : entry.user_id.substring(0, 10)}
+                            <td className="px-2 py-3 font-medium text-slate-900 truncate max-w-[120px]" title={entry.username ?? entry.user_id}>
+                              {entry.username
+                                ? (isCurrentUser ? `${entry.username} (You)` : entry.username)
+                                : (isCurrentUser ? `${entry.user_id.substring(0, 8)}... (You)` : entry.user_id.substring(0, 10))}
                             </td>
                             <td className="px-2 py-3 text-slate-600">{entry.played_games}</td>
                             <td className="px-2 py-3 text-slate-600">{entry.games_won}</td>